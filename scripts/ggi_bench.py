@@ -0,0 +1,618 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+End-to-end benchmark of the website update and of the deployment.
+
+Fixture boards of several sizes, with long label histories, are served by
+a local fake forge (GitLab or GitHub REST API) running in a separate
+process, so that the real clients and HTTP layer are measured. For each
+board, the phases of the update are timed: retrieval of the issues,
+parsing of the descriptions, CSV files, event store, progress history,
+scorecards, dashboard data points and keywords. The main sequence of the
+updater is then timed end to end, as run in CI. The deployment is also
+timed, as run in CI, on an empty project of the fake forge. The wall
+time, API calls, peak memory (RSS) and files written by each phase are
+saved as JSON, and two results files can be compared to flag regressions.
+
+usage: ggi_bench run [-h] [-s SIZES] [-e EVENTS] [-b BACKEND] [-o OUTPUT]
+       ggi_bench compare [-h] [-t THRESHOLD] baseline current
+
+optional arguments (run):
+  -h, --help                  Show this help message and exit
+  -s, --sizes SIZES           Comma-separated numbers of issues of the boards
+  -e, --events EVENTS         Number of label events per issue
+  -b, --backend BACKEND       Fake forge: gitlab or github
+  -o, --output OUTPUT         Results file (JSON)
+
+optional arguments (compare):
+  -t, --threshold THRESHOLD   Relative increase flagged as a regression, in percent
+"""
+
+import argparse
+import contextlib
+import http.server
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from ggi_deploy import extract_sections, retrieve_env
+from ggi_http import scheduler, setup_http
+from ggi_update_website import (compile_keywords, extract_workflow, file_conf, issues_cols,
+                                hist_cols, keyword_files, load_manifest, progress_history,
+                                store_events, tasks_cols, to_columns, update_keywords,
+                                write_activities_to_md, write_data_points, write_progress,
+                                write_to_csv)
+import ggi_deploy_github as github_deploy
+import ggi_deploy_gitlab as gitlab_deploy
+import ggi_update_website_github as github_updater
+import ggi_update_website_gitlab as gitlab_updater
+
+default_sizes = [25, 1000, 10000]
+default_events = 40
+default_backend = 'gitlab'
+default_output = 'build/bench.json'
+# Relative increase flagged as a regression, in percent, and the absolute
+# increases below which differences are considered as noise.
+default_threshold = 10
+noise_wall_s = 0.005
+noise_rss_mb = 2
+
+fixture_project = 'bench/board'
+phases = ['fetch', 'parse', 'csv', 'event_store', 'progress', 'markdown', 'data_points', 'keywords', 'main',
+          'deploy']
+# Options of the deployment, as run in CI (the fake forge does not serve
+# the GitHub GraphQL API used to create the Goals board).
+deploy_options = {'gitlab': ['-a', '-b', '-d', '-p'], 'github': ['-a', '-d']}
+
+
+def parse_args():
+    """
+    Parse arguments from command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the website update.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='Run the benchmark and save the results.')
+    run.add_argument('-s', '--sizes',
+                     dest='sizes',
+                     default=','.join(str(s) for s in default_sizes),
+                     help='Comma-separated numbers of issues of the boards.')
+    run.add_argument('-e', '--events',
+                     dest='events',
+                     type=int,
+                     default=default_events,
+                     help='Number of label events per issue.')
+    run.add_argument('-b', '--backend',
+                     dest='backend',
+                     choices=['gitlab', 'github'],
+                     default=default_backend,
+                     help='Fake forge: gitlab or github.')
+    run.add_argument('-o', '--output',
+                     dest='output',
+                     default=default_output,
+                     help='Results file (JSON).')
+    compare = commands.add_parser('compare', help='Compare results against a baseline.')
+    compare.add_argument('-t', '--threshold',
+                         dest='threshold',
+                         type=float,
+                         default=default_threshold,
+                         help='Relative increase flagged as a regression, in percent.')
+    compare.add_argument('baseline', help='Results file of the baseline.')
+    compare.add_argument('current', help='Results file to compare.')
+    return parser.parse_args()
+
+
+def fixture_bodies(size: int):
+    """
+    Render the issue bodies of the activities, with random scorecards,
+    for a board of the given size.
+    """
+    random.seed(0)
+    metadata, init_scorecard = retrieve_env()
+    args = SimpleNamespace(opt_random=True)
+    bodies = [extract_sections(args, init_scorecard, activity) for activity in metadata['activities']]
+    return [bodies[k % len(bodies)] for k in range(size)]
+
+
+def fixture_board(size: int, events: int, progress_labels: dict):
+    """
+    Build a board of the given size: issues whose label history moves
+    through the progress labels, among other labels.
+    """
+    rng = random.Random(0)
+    statuses = [progress_labels[p] for p in ('not_started', 'in_progress', 'done')]
+    others = ['Usage Goal', 'Trust Goal', 'Culture Goal', 'Developer', 'Team Leader']
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    issues = []
+    for k, body in enumerate(fixture_bodies(size)):
+        time_k = start + timedelta(hours=rng.randint(0, 1000))
+        history, present = [], set()
+        for e in range(events):
+            # Times have milliseconds, as on the REST APIs.
+            time_k += timedelta(hours=rng.randint(1, 72), milliseconds=rng.randint(1, 999))
+            label = statuses[min(e * 3 // events, 2)] if e % 2 == 0 else rng.choice(others)
+            if label in present and rng.random() < 0.5:
+                action = 'remove'
+                present.discard(label)
+            else:
+                action = 'add'
+                present.add(label)
+            history.append({'id': k * events + e, 'action': action, 'label': label,
+                            'user': f"user{rng.randint(1, 20)}", 'created_at': time_k})
+        # Ids are global to the forge, and differ from the issue numbers.
+        issues.append({'id': 100000 + k, 'iid': k + 1, 'title': f"Activity {k + 1}",
+                       'labels': sorted(present), 'updated_at': time_k, 'body': body, 'events': history})
+    return issues
+
+
+def gitlab_time(t: datetime):
+    """
+    Format a time as the GitLab REST API does, with milliseconds.
+    """
+    return t.strftime('%Y-%m-%dT%H:%M:%S.') + f"{t.microsecond // 1000:03d}Z"
+
+
+class FakeForge(http.server.BaseHTTPRequestHandler):
+    """
+    Minimal GitLab and GitHub REST API serving a fixture board, with the
+    GitLab GraphQL issues query, and accepting the writes of the
+    deployment (labels, issues, boards, schedules and project edits).
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written apart: do not delay the body.
+    disable_nagle_algorithm = True
+    backend = None
+    issues = []
+    created = itertools.count(1)
+
+    def send_json(self, body, url: str, links: dict = None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if self.backend == 'github':
+            self.send_header('X-GitHub-Request-Id', '0000:0000')
+        if links:
+            self.send_header('Link', ', '.join(f'<{url}?{urllib.parse.urlencode(q)}>; rel="{rel}"'
+                                               for rel, q in links.items()))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_page(self, items, convert, url: str, query: dict, per_page: int):
+        """
+        Send a page of items, converted to their JSON form, with a link
+        to the next page as both forges do.
+        """
+        per_page = int(query.get('per_page', [per_page])[0])
+        page = int(query.get('page', ['1'])[0])
+        links = {}
+        if page * per_page < len(items):
+            links['next'] = dict((k, v[0]) for k, v in query.items())
+            links['next'].update({'page': page + 1, 'per_page': per_page})
+        self.send_json([convert(i) for i in items[(page - 1) * per_page:page * per_page]], url, links)
+
+    def do_GET(self):
+        split = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(split.query)
+        base = f"http://{self.headers['Host']}"
+        url = base + split.path
+        parts = split.path.strip('/').split('/')
+        if self.backend == 'gitlab':
+            if len(parts) == 4 and parts[3] != 'issues':
+                return self.send_json({'id': 1, 'path_with_namespace': fixture_project,
+                                       'description': ''}, url)
+            if parts[-1] in ('labels', 'boards', 'pipeline_schedules'):
+                return self.send_json([], url)
+            if parts[-1] == 'issues':
+                return self.send_page(self.issues, lambda i: {
+                    'id': i['id'], 'iid': i['iid'], 'state': 'opened', 'title': i['title'],
+                    'labels': i['labels'], 'updated_at': gitlab_time(i['updated_at']),
+                    'web_url': f"{base}/{fixture_project}/-/issues/{i['iid']}",
+                    'description': i['body']}, url, query, 20)
+            if parts[-1] == 'resource_label_events':
+                return self.send_page(self.issues[int(parts[-2]) - 1]['events'], lambda e: {
+                    'id': e['id'], 'action': e['action'], 'label': {'name': e['label']},
+                    'user': {'username': e['user']},
+                    'created_at': gitlab_time(e['created_at'])},
+                    url, query, 20)
+        else:
+            # The API root differs between github.com and GitHub Enterprise.
+            root = split.path[:split.path.find('/repos/')] if '/repos/' in split.path else ''
+            repo_url = f"{base}{root}/repos/{fixture_project}"
+            if split.path.rstrip('/') == f"{root}/repos/{fixture_project}":
+                return self.send_json({'id': 1, 'name': 'board', 'full_name': fixture_project,
+                                       'url': repo_url, 'description': '', 'homepage': ''}, url)
+            if parts[-1] == 'labels':
+                return self.send_json([], url)
+            if parts[-1] == 'issues':
+                return self.send_page(self.issues, lambda i: {
+                    'id': i['id'], 'number': i['iid'], 'state': 'open', 'title': i['title'],
+                    'labels': [{'name': label} for label in i['labels']],
+                    'updated_at': i['updated_at'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'url': f"{repo_url}/issues/{i['iid']}",
+                    'html_url': f"{base}/{fixture_project}/issues/{i['iid']}",
+                    'body': i['body']}, url, query, 30)
+            if parts[-1] == 'events':
+                return self.send_page(self.issues[int(parts[-2]) - 1]['events'], lambda e: {
+                    'id': e['id'], 'event': 'labeled' if e['action'] == 'add' else 'unlabeled',
+                    'label': {'name': e['label']}, 'actor': {'login': e['user']},
+                    'created_at': e['created_at'].strftime('%Y-%m-%dT%H:%M:%SZ')},
+                    url, query, 30)
+        self.send_error(404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        base = f"http://{self.headers['Host']}"
+        path = urllib.parse.urlsplit(self.path).path
+        if path.endswith('/graphql'):
+            if self.backend != 'gitlab':
+                return self.send_error(404)
+            return self.send_issues_graphql(body, base)
+        # Creation of a label, issue, board, board list or schedule.
+        k = next(self.created)
+        created = dict(body, id=k, iid=k, number=k, url=f"{base}{path}/{k}")
+        if self.backend == 'gitlab' and path.endswith('/lists'):
+            created['label'] = {'id': body.get('label_id')}
+        self.send_json(created, base + path)
+
+    def do_PUT(self):
+        # Project edits: the updated project is sent back.
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.send_json(dict(body, id=1, path_with_namespace=fixture_project),
+                       f"http://{self.headers['Host']}{self.path}")
+
+    do_PATCH = do_PUT
+
+    def send_issues_graphql(self, body: dict, base: str):
+        """
+        Answer the GitLab GraphQL issues query.
+        """
+        variables = body['variables']
+        start = int(variables['after'] or 0)
+        end = start + variables['first']
+        nodes = [{'iid': str(i['iid']), 'state': 'opened', 'title': i['title'], 'description': i['body'],
+                  'updatedAt': i['updated_at'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+                  'webUrl': f"{base}/{fixture_project}/-/issues/{i['iid']}",
+                  'labels': {'nodes': [{'title': label} for label in i['labels']]}}
+                 for i in self.issues[start:end]]
+        page_info = {'hasNextPage': end < len(self.issues), 'endCursor': str(end)}
+        self.send_json({'data': {'project': {'issues': {'pageInfo': page_info, 'nodes': nodes}}}},
+                       base + self.path)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(backend: str, size: int, events: int, progress_labels: dict, ports):
+    """
+    Run the fake forge for a board (in a separate process).
+    """
+    FakeForge.backend = backend
+    FakeForge.issues = fixture_board(size, events, progress_labels)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FakeForge)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def fake_forge(backend: str, size: int, events: int, progress_labels: dict):
+    """
+    Serve a fixture board from a fake forge, and yield its URL.
+    """
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(backend, size, events, progress_labels, ports),
+                                     daemon=True)
+    server.start()
+    try:
+        yield f"http://127.0.0.1:{ports.get(timeout=120)}"
+    finally:
+        server.terminate()
+        server.join()
+
+
+@contextlib.contextmanager
+def scratch_workdir(conf: dict, env: dict):
+    """
+    Run from a scratch copy of the repository, with the given configuration
+    and environment variables, so that the entry points can be run as in CI
+    without touching the working tree. Yields the scratch directory.
+    """
+    root = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='ggi_work_')
+    for name in ('web', 'resources'):
+        os.symlink(os.path.join(root, name), os.path.join(work_dir, name))
+    os.makedirs(os.path.join(work_dir, 'conf'))
+    for name in os.listdir('conf'):
+        if name != os.path.basename(file_conf):
+            os.symlink(os.path.join(root, 'conf', name), os.path.join(work_dir, 'conf', name))
+    with open(os.path.join(work_dir, file_conf), 'w', encoding='utf-8') as f:
+        json.dump(conf, f, indent=4)
+    # The forge utilities read the configuration next to the scripts.
+    utils = [sys.modules[m] for m in ('ggi_utils_github', 'ggi_utils_gitlab') if m in sys.modules]
+    saved_conf = [u.conf_file for u in utils]
+    for u in utils:
+        u.conf_file = os.path.join(work_dir, file_conf)
+    # CI variables of the forges take precedence over ours.
+    saved_env = {k: v for k, v in os.environ.items() if k.startswith(('CI_', 'GITHUB_', 'GGI_'))}
+    for k in saved_env:
+        del os.environ[k]
+    os.environ.update(env)
+    os.chdir(work_dir)
+    try:
+        yield work_dir
+    finally:
+        os.chdir(root)
+        for u, conf_file in zip(utils, saved_conf):
+            u.conf_file = conf_file
+        for k in env:
+            os.environ.pop(k, None)
+        os.environ.update(saved_env)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def entry_point(backend: str, url: str, conf: dict):
+    """
+    Return the main sequence of the updater of a forge, with the
+    configuration and environment variables to run it against the fake
+    forge at url.
+    """
+    conf = dict(conf, http_cache_dir=None, http_max_rate=1e6)
+    if backend == 'gitlab':
+        env = {'GGI_GITLAB_URL': url, 'GGI_GITLAB_PROJECT': fixture_project,
+               'GGI_GITLAB_TOKEN': 'bench', 'CI_PAGES_URL': url}
+        conf.update(gitlab_url=None, gitlab_project=None)
+        return gitlab_updater.main, conf, env
+    env = {'GGI_GITHUB_TOKEN': 'bench'}
+    conf.update(github_project=fixture_project, github_host=url)
+    return github_updater.main, conf, env
+
+
+def peak_rss_reset():
+    """
+    Reset the peak RSS of the process, where supported (Linux).
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """
+    Return the peak RSS of the process, in MB.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextlib.contextmanager
+def measure(results: dict, phase: str, manifest: dict = None):
+    """
+    Record the wall time, API calls, peak RSS and files written by a phase.
+    """
+    peak_rss_reset()
+    calls = scheduler.calls()
+    written = len(manifest['written']) if manifest else 0
+    start = time.perf_counter()
+    stats = {'files': 0}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield stats
+    results[phase] = {
+        'wall_s': round(time.perf_counter() - start, 4),
+        'api_calls': scheduler.calls() - calls,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'files': stats['files'] + (len(manifest['written']) - written if manifest else 0),
+    }
+
+
+def bench_board(backend: str, size: int, events: int, conf: dict):
+    """
+    Run all the phases on a fixture board, and return their measures.
+    """
+    with fake_forge(backend, size, events, conf['progress_labels']) as url:
+        return bench_phases(backend, url, size, conf)
+
+
+def bench_phases(backend: str, url: str, size: int, conf: dict):
+    """
+    Run all the phases against the fake forge at url.
+    """
+    params = dict(conf, http_cache_dir=None, http_max_rate=1e6, parse_cache_file=None)
+    if backend == 'gitlab':
+        params.update({'GGI_GITLAB_URL': url, 'GGI_GITLAB_TOKEN': 'bench', 'GGI_GITLAB_PROJECT': fixture_project})
+        retrieve_issues = gitlab_updater.retrieve_gitlab_issues
+    else:
+        params.update({'GGI_GITHUB_URL': url, 'GGI_GITHUB_TOKEN': 'bench', 'GGI_GITHUB_PROJECT': fixture_project,
+                       'GGI_API_URL': url})
+        retrieve_issues = github_updater.retrieve_github_issues
+    params.update({'GGI_URL': url, 'GGI_PAGES_URL': url, 'GGI_ACTIVITIES_URL': url})
+    setup_http(params)
+
+    web_dir = tempfile.mkdtemp(prefix='ggi_bench_')
+    results = {}
+    try:
+        with measure(results, 'fetch'):
+            issues, tasks, hist = retrieve_issues(params)
+        bodies = fixture_bodies(size)
+        with measure(results, 'parse'):
+            for body in bodies:
+                extract_workflow(body)
+        manifest = load_manifest(web_dir)
+        with measure(results, 'csv', manifest):
+            columns = to_columns(issues, issues_cols)
+            write_to_csv(columns, to_columns(tasks, tasks_cols), to_columns(hist, hist_cols), web_dir, manifest)
+        with measure(results, 'event_store'):
+            store_params = dict(params, event_store=os.path.join(web_dir, 'events.sqlite'))
+            hist = store_events(store_params, fixture_project, issues, hist)
+        with measure(results, 'progress', manifest):
+            history = progress_history(params)
+            history.add(issues, hist)
+            write_progress(history, web_dir, manifest)
+        issues = columns
+        with measure(results, 'markdown', manifest):
+            write_activities_to_md(issues, web_dir, manifest)
+        with measure(results, 'data_points', manifest):
+            write_data_points(issues, params, web_dir, manifest)
+        keywords = {'[GGI_URL]': url, '[GGI_PAGES_URL]': url, '[GGI_ACTIVITIES_URL]': url,
+                    '[GGI_CURRENT_DATE]': '2025-01-01'}
+        with measure(results, 'keywords') as stats:
+            matcher = compile_keywords(keywords)
+            for rel_path in keyword_files('web'):
+                dst = os.path.join(web_dir, rel_path)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                existed = os.path.exists(dst)
+                if update_keywords(os.path.join('web', rel_path), keywords, matcher, dst) or not existed:
+                    stats['files'] += 1
+        results['events'] = len(hist)
+    finally:
+        shutil.rmtree(web_dir, ignore_errors=True)
+
+    main, main_conf, env = entry_point(backend, url, conf)
+    # The updater resets the call counts when it sets up HTTP.
+    scheduler.configure(main_conf)
+    with scratch_workdir(main_conf, env), measure(results, 'main') as stats:
+        argv, sys.argv = sys.argv, [f'ggi_update_website_{backend}.py']
+        try:
+            main()
+        finally:
+            sys.argv = argv
+        stats['files'] = len(load_manifest(main_conf.get('output_dir', 'build/web'))['previous'])
+    return results
+
+
+def bench_deploy(backend: str, conf: dict):
+    """
+    Run the deployment, as in CI, on an empty project of a fake forge, and
+    return its measures. Writes are paced as configured, so that the time
+    spent waiting between them is measured.
+    """
+    results = {}
+    with fake_forge(backend, 0, 0, conf['progress_labels']) as url:
+        _, deploy_conf, env = entry_point(backend, url, conf)
+        main = gitlab_deploy.main if backend == 'gitlab' else github_deploy.main
+        with scratch_workdir(deploy_conf, env):
+            # The deployment resets the call counts when it sets up HTTP.
+            scheduler.configure(deploy_conf)
+            with measure(results, 'deploy'):
+                argv, sys.argv = sys.argv, [f'ggi_deploy_{backend}.py'] + deploy_options[backend]
+                try:
+                    main()
+                finally:
+                    sys.argv = argv
+    return results
+
+
+def print_results(results: dict):
+    """
+    Print the measures of the phases run on a board.
+    """
+    print(f"  {'Phase':<12} {'Wall':>9} {'API calls':>10} {'Peak RSS':>10} {'Files':>6}")
+    for phase in [p for p in phases if p in results]:
+        r = results[phase]
+        print(f"  {phase:<12} {r['wall_s'] * 1000:>7.0f}ms {r['api_calls']:>10} "
+              f"{r['peak_rss_mb']:>8.0f}MB {r['files']:>6}")
+
+
+def run(args):
+    """
+    Run the benchmark on boards of all sizes, and save the results.
+    """
+    with open(file_conf, 'r', encoding='utf-8') as f:
+        conf = json.load(f)
+    sizes = [int(s) for s in args.sizes.split(',')]
+    output = {'meta': {'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'backend': args.backend, 'events_per_issue': args.events},
+              'results': {}}
+    for size in sizes:
+        print(f"# Benchmarking a {args.backend} board of {size} issues, {args.events} events each..")
+        results = bench_board(args.backend, size, args.events, conf)
+        output['results'][f"{args.backend}/{size}"] = results
+        print_results(results)
+    # The deployment does not depend on the size of the board.
+    print(f"# Benchmarking the {args.backend} deployment on an empty project..")
+    results = bench_deploy(args.backend, conf)
+    output['results'][f"{args.backend}/deploy"] = results
+    print_results(results)
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+    print(f"# Results written to {args.output}.")
+
+
+def compare(args):
+    """
+    Compare results against a baseline, and fail on regressions.
+    """
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)['results']
+    ratio = 1 + args.threshold / 100
+    regressions = 0
+    print(f"  {'Board':<14} {'Phase':<12} {'Metric':<12} {'Baseline':>10} {'Current':>10} {'Change':>8}")
+    for board in baseline:
+        if board not in current:
+            print(f"  {board:<14} missing from {args.current}.")
+            continue
+        for phase in [p for p in phases if p in baseline[board] and p in current[board]]:
+            base, cur = baseline[board][phase], current[board][phase]
+            for metric, noise in (('wall_s', noise_wall_s), ('peak_rss_mb', noise_rss_mb),
+                                  ('api_calls', 0), ('files', 0)):
+                change = (cur[metric] - base[metric]) / base[metric] * 100 if base[metric] else 0
+                if metric in ('api_calls', 'files'):
+                    regression = cur[metric] > base[metric]
+                else:
+                    regression = cur[metric] > base[metric] * ratio and cur[metric] - base[metric] > noise
+                regressions += regression
+                flag = '  REGRESSION' if regression else ''
+                print(f"  {board:<14} {phase:<12} {metric:<12} {base[metric]:>10} {cur[metric]:>10} "
+                      f"{change:>+7.0f}%{flag}")
+
+    if regressions:
+        print(f"{regressions} regressions above {args.threshold:.0f}%.")
+        exit(1)
+    print("No regression.")
+
+
+def main():
+    """
+    Main sequence.
+    """
+    args = parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+Micro-benchmark of the scorecard parser (extract_workflow).
+
+Issue bodies are rendered from the activities metadata as the deploy
+script does, with random scorecards. A second corpus of very large
+bodies, with many objectives and a long description, measures how the
+parser scales.
+
+usage: ggi_bench_parser [-h] [-r REPEAT] [-t TASKS]
+
+optional arguments:
+  -h, --help                  Show this help message and exit
+  -r, --repeat REPEAT         Number of timed runs, the best one is reported
+  -t, --tasks TASKS           Number of objectives in the large bodies
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from ggi_deploy import extract_sections, retrieve_env
+from ggi_update_website import extract_workflow
+
+default_repeat = 5
+default_large_tasks = 20000
+
+
+def parse_args():
+    """
+    Parse arguments from command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the scorecard parser.")
+    parser.add_argument('-r', '--repeat',
+                        dest='repeat',
+                        type=int,
+                        default=default_repeat,
+                        help='Number of timed runs, the best one is reported.')
+    parser.add_argument('-t', '--tasks',
+                        dest='tasks',
+                        type=int,
+                        default=default_large_tasks,
+                        help='Number of objectives in the large bodies.')
+    return parser.parse_args()
+
+
+def realistic_bodies(metadata, init_scorecard):
+    """
+    Render the issue bodies of all activities, with random scorecards.
+    """
+    args = SimpleNamespace(opt_random=True)
+    return [extract_sections(args, init_scorecard, activity) for activity in metadata['activities']]
+
+
+def large_bodies(bodies, tasks: int):
+    """
+    Grow a few bodies with many objectives and a long description.
+    """
+    objectives = ''.join(f"- [{'x' if random.randint(1, 4) == 1 else ' '}] objective {idx}\n"
+                         for idx in range(tasks))
+    filler = '\n\n'.join(['Lorem ipsum dolor sit amet, consectetur adipiscing elit.'] * (tasks // 10))
+    return [body.replace("What we aim to achieve in this iteration.", objectives)
+                .replace("### Description\n\n", f"### Description\n\n{filler}\n\n", 1)
+            for body in bodies[:3]]
+
+
+def bench(bodies, repeat: int):
+    """
+    Parse all the bodies, and return the best time of several runs.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in bodies:
+            extract_workflow(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """
+    Main sequence.
+    """
+    args = parse_args()
+    random.seed(0)
+    metadata, init_scorecard = retrieve_env()
+    realistic = realistic_bodies(metadata, init_scorecard) * 40
+    corpora = [('realistic', realistic), ('large', large_bodies(realistic, args.tasks))]
+
+    print(f"\n  {'Corpus':<10} {'Bodies':>7} {'MB':>8} {'Best':>9} {'Bodies/s':>10} {'MB/s':>8}")
+    for name, bodies in corpora:
+        size = sum(len(body) for body in bodies) / 1e6
+        best = bench(bodies, args.repeat)
+        print(f"  {name:<10} {len(bodies):>7} {size:>8.2f} {best * 1000:>7.1f}ms "
+              f"{len(bodies) / best:>10.0f} {size / best:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,7 +19,7 @@ This script:
 The script expects your GitLab private key in the environment variable: GGI_GITLAB_TOKEN
 You may also set an environment variable 'GGI_DEMO_MODE' to 'true' to activate the demo mode.
 
-usage: ggi_deploy [-h] [-a] [-b] [-d] [-p]
+usage: ggi_deploy [-h] [-a] [-b] [-d] [-p] [-r] [-n] [-R]
 
 optional arguments:
   -h, --help                  Show this help message and exit
@@ -28,6 +28,8 @@ optional arguments:
   -b, --board                 Create board
   -d, --project-description   Update Project Description with pointers to the Board and Dashboard
   -p, --schedule-pipeline     Schedule nightly pipeline to update dashboard
+  -n, --plan                  Only print the deployment plan, do not apply it
+  -R, --resume                Create the activities missing from existing issues
 """
 import argparse
 import json
@@ -35,6 +37,9 @@ import os
 import random
 import re
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ggi_http import scheduler
 
 # Define some variables.
 conf_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + '/conf'
@@ -42,6 +47,8 @@ activities_file = conf_dir + '/ggi_activities_full.json'
 conf_file = conf_dir + '/ggi_deployment.json'
 init_scorecard_file = conf_dir + '/workflow_init.inc'
 
+# Default number of concurrent issue creations.
+default_deploy_workers = 4
 
 # Define some regexps
 re_section = re.compile(r"^### (?P<section>.*?)\s*$")
@@ -76,6 +83,15 @@ def parse_args():
                         dest='opt_random',
                         action='store_true',
                         help='Random Scorecard objectives and Activities status, for demo purposes')
+    parser.add_argument('-n', '--plan',
+                        dest='opt_plan',
+                        action='store_true',
+                        help='Only print the deployment plan and its number of API calls, do not apply it')
+    parser.add_argument('-R', '--resume',
+                        dest='opt_resume',
+                        action='store_true',
+                        help='Create the activities whose title matches no existing issue, '
+                             'e.g. after an interrupted deployment')
     args = parser.parse_args()
 
     if 'GGI_DEMO_MODE' in os.environ:
@@ -152,3 +168,126 @@ def extract_sections(args, init_scorecard, activity):
         content_text += '\n\n'.join(content[key])
     return content_text
 
+
+def render_activities(args, params, metadata, init_scorecard):
+    """
+    Render the title, body and labels of all activities up front.
+    """
+    activities = []
+    for activity in metadata['activities']:
+        progress_label = params['progress_labels']['not_started']
+        if args.opt_random:
+            # Random choice among the valid progress labels.
+            progress_idx = random.choice(list(params['progress_labels']) + ['none'])
+            if progress_idx != 'none':
+                progress_label = params['progress_labels'][progress_idx]
+        labels = [activity['goal']] + activity['roles']
+        if progress_label != '':
+            labels = labels + [progress_label]
+        activities.append({'id': activity['id'],
+                           'title': activity['name'],
+                           'body': extract_sections(args, init_scorecard, activity),
+                           'labels': labels})
+    return activities
+
+
+def create_activities(activities, create_batch, batch_size: int = 1,
+                      workers: int = default_deploy_workers):
+    """
+    Create the activities issues, by batches submitted concurrently.
+
+    create_batch is called with a list of activities, and returns for each
+    of them None on success or an error message. Failures are reported per
+    activity. They can be created by running the deployment again with
+    the --resume option.
+    """
+    for a in activities:
+        print(f"  - Issue: {a['title']:<60} Labels: {a['labels']}")
+
+    def run_batch(batch):
+        try:
+            return create_batch(batch)
+        except Exception as e:
+            return [repr(e)] * len(batch)
+
+    batches = [activities[i:i + batch_size] for i in range(0, len(activities), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = [e for errors in executor.map(run_batch, batches) for e in errors]
+
+    failed = []
+    for a, error in zip(activities, results):
+        if error is not None:
+            failed.append(a['id'])
+            print(f" Failed to create {a['id']} ({a['title']}): {error}")
+
+    if failed:
+        print(f" {len(failed)} activities failed: {', '.join(failed)}. "
+              f"Run the deployment again with --resume to create them.")
+    print(f" Created {len(activities) - len(failed)} activities.")
+    return failed
+
+
+def missing_activities(activities, issue_titles, resume: bool):
+    """
+    Return the activities to create, given the titles of the existing
+    issues. Activities are only created on a project without issues, unless
+    resuming: then those whose title matches no issue are created.
+    """
+    if not issue_titles:
+        return activities
+    if not resume:
+        print(" Ignore activities, Issues already exist")
+        return []
+    return [a for a in activities if a['title'] not in issue_titles]
+
+
+def desired_labels(metadata, params: dict):
+    """
+    Return the labels expected on the project, as (name, colour) tuples:
+    roles, progress and goals labels.
+    """
+    labels = OrderedDict()
+    for label, colour in metadata['roles'].items():
+        labels[label] = colour
+    for label in params['progress_labels'].values():
+        if label != '':
+            labels[label] = '#ed9121'
+    for goal in metadata['goals']:
+        labels[goal['name']] = goal['colour']
+    return list(labels.items())
+
+
+def plan_op(action: str, kind: str, name: str, calls: int, apply):
+    """
+    Build an operation of the deployment plan.
+    action is '+' for a creation or '~' for an update, calls is the
+    estimated number of API calls, and apply the function doing it.
+    """
+    return {'action': action, 'kind': kind, 'name': name, 'calls': calls, 'apply': apply}
+
+
+def print_plan(plan, snapshot_calls: int):
+    """
+    Print the operations of the deployment plan and the number of API calls
+    they need.
+    """
+    print("\n# Deployment plan")
+    print(f" Current state read in {snapshot_calls} API calls.")
+    if not plan:
+        print(" No change needed.")
+    for op in plan:
+        print(f"  {op['action']} {op['kind']:<12} {op['name']:<50} ({op['calls']} calls)")
+    print(f" {len(plan)} operations, {sum(op['calls'] for op in plan)} API calls estimated.")
+
+
+def apply_plan(plan):
+    """
+    Apply the operations of the deployment plan, in order.
+    """
+    if not plan:
+        return
+    print("\n# Apply deployment plan")
+    start = scheduler.calls()
+    for op in plan:
+        op['apply']()
+    print(f"\n Applied {len(plan)} operations in {scheduler.calls() - start} API calls.")
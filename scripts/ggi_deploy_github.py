@@ -12,28 +12,66 @@
 """
 
 """
-import time
-
-import requests
 from github import GithubException
 
+from ggi_http import *
 from ggi_utils_github import *
 
+# Number of issues created per GraphQL request.
+default_issue_batch_size = 10
+# Name of the GitHub project used as Goals board.
+goals_project_name = "Goals Project"
+ggi_homepage = "https://ospo-alliance.org/"
+
 
 def setup_github(metadata, params: dict, init_scorecard, args: dict):
     """
     Executes the following deployment sequence on a GitHub instance:
     * Reads github-specific variables.
     * Connect to GitHub
-    * Create labels & activities
-    * Create Goals board
-    * Create schedule for pipeline
+    * Read the current state of the project
+    * Plan the labels, activities and Goals board to create
+    * Apply the plan, unless only asked for it
     """
     repo, github_handle, headers = get_authent(params)
 
+    start = scheduler.calls()
+    snapshot = snapshot_github(repo, params, args)
+    plan = plan_github(repo, metadata, params, init_scorecard, args, snapshot)
+    print_plan(plan, scheduler.calls() - start)
+    if not args.opt_plan:
+        apply_plan(plan)
+
+    # Close the connection.
+    github_handle.close()
+
+
+def snapshot_github(repo, params: dict, args: dict):
+    """
+    Read in one pass the current state of the parts of the project
+    managed by the deployment.
+    """
+    print("\n# Read current state of the project")
+    snapshot = {}
+    if args.opt_activities:
+        snapshot['labels'] = {label.name for label in repo.get_labels()}
+        # Activities are matched by title when resuming, whatever the state of their issue.
+        snapshot['issue_titles'] = {i.title for i in repo.get_issues(state='all')}
+    if args.opt_board:
+        snapshot['goals_project'], snapshot['goals_owner'], snapshot['goals_repository'] = \
+            lookup_goals_project(params)
+    return snapshot
+
+
+def plan_github(repo, metadata, params: dict, init_scorecard, args: dict, snapshot: dict):
+    """
+    Diff the desired state of the project against its snapshot, and
+    return the operations needed to reconcile them.
+    """
+    plan = []
+
     # Update current project description with Website URL
     if args.opt_projdesc:
-        print("\n# Update Project description")
         ggi_activities_url = params['GITHUB_ACTIVITIES_URL']
 
         repo_fullname = os.getenv("GITHUB_REPOSITORY", "unknown/repo")  # "username/repository-name"
@@ -44,151 +82,149 @@ def setup_github(metadata, params: dict, init_scorecard, args: dict):
         desc = (
             'Here you will find your dashboard: ' + github_pages_url + ' and the issues board: ' + ggi_activities_url + ' with all activities describing the local GGI'
         )
-        print(f"New description:\n<<<---------\n{desc}\n--------->>>\n")
-
-        # Update the repository description
-        repo.edit(description=desc, homepage="https://ospo-alliance.org/")
+        if repo.description != desc or repo.homepage != ggi_homepage:
+            print(f"New description:\n<<<---------\n{desc}\n--------->>>\n")
+            plan.append(plan_op('~', 'description', params['GGI_GITHUB_PROJECT'], 1,
+                                lambda: repo.edit(description=desc, homepage=ggi_homepage)))
 
-    #
-    # Create labels & activities
-    #
     if args.opt_activities:
+        # Create missing role, progress and goal labels.
+        for name, colour in desired_labels(metadata, params):
+            if name not in snapshot['labels']:
+                plan.append(plan_op('+', 'label', name, 1,
+                                    lambda name=name, colour=colour: create_github_label(
+                                        repo, snapshot['labels'], name, {'name': name, 'color': colour})))
+
+        # Create the activities, on a project without issues or when resuming.
+        activities = missing_activities(render_activities(args, params, metadata, init_scorecard),
+                                        snapshot['issue_titles'], args.opt_resume)
+        if activities:
+            todo = len(activities)
+            workers = params.get('deploy_workers', default_deploy_workers)
+            if params.get('github_backend', 'rest') == 'graphql':
+                batch_size = params.get('github_issue_batch_size', default_issue_batch_size)
+                calls = 1 + (todo + batch_size - 1) // batch_size
+
+                def apply_activities():
+                    repo_id, label_ids = get_repo_label_ids(params)
+                    create_activities(activities,
+                                      lambda batch: create_github_issues_graphql(params, repo_id, label_ids, batch),
+                                      batch_size, workers)
+            else:
+                calls = todo
 
-        # Create labels.
-        print("\n# Manage labels")
-
-        # Create role labels if needed
-        print("\n Roles labels")
-        for label, colour in metadata['roles'].items():
-            create_github_label(repo, label, {'name': label, 'color': colour})
-
-        # Create labels for activity tracking
-        print("\n Progress labels")
-        for name, label in params['progress_labels'].items():
-            create_github_label(repo, label, {'name': label, 'color': 'ed9121'})
-
-        # Create goal labels if needed
-        print("\n Goal labels")
-        for goal in metadata['goals']:
-            create_github_label(repo, goal['name'],
-                                {'name': goal['name'], 'color': goal['colour']})
-
-        # Create issues with their associated labels.
-        print("\n# Create activities.")
-        # First test the existence of Activities Issues:
-        #   if at least one Issue is found bearing one Goal label,
-        #   consider that all Issues exist and do not add any.
-        open_issues = repo.get_issues(state='open')
-        if open_issues.totalCount > 0:
-            print("Ignore, Issues already exist")
-        else:
-            for activity in metadata['activities']:
-                progress_label = params['progress_labels']['not_started']
-                if args.opt_random:
-                    # Choix aléatoire parmi les étiquettes de progression valides
-                    progress_idx = random.choice(list(params['progress_labels']) + ['none'])
-                    if progress_idx != 'none':
-                        progress_label = params['progress_labels'][progress_idx]
-                labels = [activity['goal']] + activity['roles']
-                if progress_label != '':
-                    labels = labels + [progress_label]
-
-                print(f"  - Issue: {activity['name']:<60} Labels: {labels}")
-                # Création de l'issue
-                try:
-                    issue = repo.create_issue(
-                        title=activity['name'],
-                        body=extract_sections(args, init_scorecard, activity),
-                        labels=labels
-                    )
-                    time.sleep(2)
-                except GithubException as e:
-                    print(f"Status: {e.status}, Data: {e.data}")
-
-    # Create Goals board
-    if args.opt_board:
-        create_project_graphql(params)
+                def apply_activities():
+                    # One at a time, so that issue numbers follow the order of
+                    # the activities, and the PyGithub repo is not shared
+                    # between threads.
+                    create_activities(activities,
+                                      lambda batch: [create_github_issue(repo, a) for a in batch],
+                                      1, 1)
+            plan.append(plan_op('+', 'activities', f"{todo} issues", calls, apply_activities))
 
-    # Close the connection.
-    github_handle.close()
+    # Create Goals board: project and field (the owner and repository ids
+    # come with the snapshot).
+    if args.opt_board and snapshot['goals_project'] is None:
+        plan.append(plan_op('+', 'project', goals_project_name, 2,
+                            lambda: create_project_graphql(params, snapshot['goals_owner'],
+                                                           snapshot['goals_repository'])))
+
+    return plan
 
-def create_github_label(repo, new_label, label_args):
-    existing_labels = {label.name for label in repo.get_labels()}
 
+def create_github_issue(repo, activity):
     """
-    Creates a set of labels in the GitHub project.
+    Create an activity issue with the REST API.
+    Returns None on success, or the error message.
     """
-    if new_label in existing_labels:
-        print(f" Ignore label: {new_label}")
-    else:
-        print(f" Create label: {new_label}")
-        name = label_args['name']
-        color = label_args['color'].replace("#","")
-        repo.create_label(name, color)
+    try:
+        repo.create_issue(title=activity['title'], body=activity['body'],
+                          labels=activity['labels'])
+    except GithubException as e:
+        return f"Status: {e.status}, Data: {e.data}"
+    return None
 
-def get_owner_id(owner, gh_token):
-    url = 'https://api.github.com/graphql'
-
-    headers = {
-        'Authorization': f'bearer {gh_token}',
-        'Content-Type': 'application/json'
-    }
 
+def get_repo_label_ids(params):
+    """
+    Retrieve the node ids of the repository and of its labels.
+    """
+    owner, name = params['GGI_GITHUB_PROJECT'].split('/')
     query = """
-        query ($owner: String!) {
-          user(login: $owner) {
-            id
-            next_global_id
-          }
-          organization(login: $owner) {
+        query ($owner: String!, $name: String!, $after: String) {
+          repository(owner: $owner, name: $name) {
             id
-            next_global_id
+            labels(first: 100, after: $after) {
+              pageInfo { hasNextPage endCursor }
+              nodes { id name }
+            }
           }
         }
     """
+    variables = {'owner': owner, 'name': name, 'after': None}
+    label_ids = {}
+    while True:
+        repository = github_graphql(params, query, variables)['repository']
+        label_ids.update({label['name']: label['id'] for label in repository['labels']['nodes']})
+        if not repository['labels']['pageInfo']['hasNextPage']:
+            return repository['id'], label_ids
+        variables['after'] = repository['labels']['pageInfo']['endCursor']
 
-    variables = {"owner": owner}
-    response = requests.post(url, headers=headers, json={'query': query, 'variables': variables})
-
-    if response.status_code == 200:
-        data = response.json()
-        print("Réponse GitHub pour owner ID:", data)  # DEBUG
-
-        # Vérifier si c'est un utilisateur
-        if data.get('data', {}).get('user'):
-            user_data = data['data']['user']
-            return user_data.get('next_global_id', user_data['id'])  # Utilise next_global_id si disponible
-
-        # Vérifier si c'est une organisation
-        elif data.get('data', {}).get('organization'):
-            org_data = data['data']['organization']
-            return org_data.get('next_global_id', org_data['id'])  # Utilise next_global_id si disponible
-
-        else:
-            raise Exception("Impossible de récupérer l'ID du propriétaire.")
 
+def create_github_issues_graphql(params, repo_id, label_ids, batch):
+    """
+    Create a batch of activity issues with a single GraphQL request,
+    using one aliased createIssue mutation per activity.
+    Returns for each activity None on success, or the error message.
+    """
+    parts = {}
+    for k, activity in enumerate(batch):
+        parts[f"a{k}"] = ("createIssue(input: $input) { issue { number } }",
+                          {'input': ('CreateIssueInput!', {
+                              'repositoryId': repo_id,
+                              'title': activity['title'],
+                              'body': activity['body'],
+                              'labelIds': [label_ids[label] for label in activity['labels']]})})
+    try:
+        data, errors = github_graphql_batch(params, parts, mutation=True)
+    except Exception as e:
+        return [str(e)] * len(batch)
+    return [None if data.get(alias) is not None else errors.get(alias, 'Not created.')
+            for alias in parts]
+
+
+def create_github_label(repo, existing_labels, new_label, label_args):
+    """
+    Create label if it does not already exist.
+    """
+    if new_label in existing_labels:
+        print(f" Ignore label: {new_label}")
     else:
-        raise Exception(f"Query failed with status {response.status_code}: {response.text}")
-
-def create_project_graphql(params):
-    print(f"\n# Create Goals board: {ggi_board_name}")
-
-    access_token = params['GGI_GITHUB_TOKEN']
-    headers = {'Authorization': f'bearer {access_token}'}
-    graphql_url = 'https://api.github.com/graphql'
-
-    repo_infos = params['GGI_GITHUB_PROJECT'].split("/")
-    repo_owner = repo_infos[0]
-    repo_name = repo_infos[1]
+        print(f" Create label: {new_label}")
+        name = label_args['name']
+        color = label_args['color'].replace("#","")
+        repo.create_label(name, color)
+        existing_labels.add(new_label)
 
-    # Query to check for an existing project
+def lookup_goals_project(params):
+    """
+    Return the id of the Goals project of the repository (or None), and
+    the ids of the owner and of the repository, in a single query. Only
+    projects linked to the repository are considered, as created by
+    create_project_graphql.
+    """
+    repo_owner, repo_name = params['GGI_GITHUB_PROJECT'].split("/")
     query = """
         query ($repo_owner: String!, $repo_name: String!, $project_name: String!) {
           repository(owner: $repo_owner, name: $repo_name) {
-            projects(search: $project_name, first: 10) {
+            id
+            owner {
+              id
+            }
+            projectsV2(query: $project_name, first: 10) {
               nodes {
                 id
-                name
+                title
               }
             }
           }
@@ -197,23 +233,35 @@ def create_project_graphql(params):
     variables = {
         "repo_owner": repo_owner,
         "repo_name": repo_name,
-        "project_name": "Goals Project"
+        "project_name": goals_project_name
     }
-    response = requests.post(graphql_url, json={'query': query, 'variables': variables}, headers=headers)
-    projects_data = json.loads(response.text)
+    repository = github_graphql(params, query, variables)['repository']
 
-    # Check if project exists and find its ID
+    for project in repository['projectsV2']['nodes']:
+        if project['title'] == goals_project_name:
+            return project['id'], repository['owner']['id'], repository['id']
+    return None, repository['owner']['id'], repository['id']
+
+
+def create_project_graphql(params, owner_id: str = None, repository_id: str = None):
+    """
+    Create the Goals project, linked to the repository, and its Goal
+    Category field, unless it already exists (the lookup is skipped if
+    the ids of the owner and of the repository are given, see
+    lookup_goals_project).
+    """
+    print(f"\n# Create Goals board: {ggi_board_name}")
+
+    # Check if project exists, and find the id of the owner.
     project_id = None
-    for project in projects_data['data']['repository']['projects']['nodes']:
-        if project['name'] == variables['project_name']:
-            project_id = project['id']
-            break
+    if owner_id is None or repository_id is None:
+        project_id, owner_id, repository_id = lookup_goals_project(params)
 
     # If the project does not exist, create it
     if not project_id:
         mutation_create_project = """
-            mutation ($title: String!, $owner_id: ID!) {
-              createProjectV2(input: {title: $title, ownerId: $owner_id}) {
+            mutation ($title: String!, $owner_id: ID!, $repository_id: ID!) {
+              createProjectV2(input: {title: $title, ownerId: $owner_id, repositoryId: $repository_id}) {
                 projectV2 {
                   id
                   title
@@ -221,64 +269,17 @@ def create_project_graphql(params):
               }
             }
         """
-
-        # Fetching the repository ID for ownerId in mutation
-        repo_id_query = """
-            query ($repo_owner: String!, $repo_name: String!) {
-              repository(owner: $repo_owner, name: $repo_name) {
-                id
-              }
-            }
-            """
-
-        variables = {
-            "repo_owner": repo_owner,
-            "repo_name": repo_name
-        }
-        repo_response = requests.post(graphql_url, json={'query': repo_id_query, 'variables': variables}, headers=headers)
-        repo_id = json.loads(repo_response.text)['data']['repository']['id']
-        print("repo ID = " + repo_id)
-
-        owner_id_query = """
-            query ($repo_owner: String!) {
-              user(login: $repo_owner) {
-                id
-              }
-              organization(login: $repo_owner) {
-                id
-              }
-            }
-        """
-
-        variables = {"repo_owner": repo_owner}
-        owner_response = requests.post(graphql_url, json={'query': owner_id_query, 'variables': variables},
-                                       headers=headers)
-        owner_data = owner_response.json()
-
-        print("Réponse GitHub pour owner ID:", owner_data)  # Vérification
-
-        # Vérifie si c'est un utilisateur ou une organisation
-        if owner_data.get('data', {}).get('user'):
-            owner_id = owner_data['data']['user']['id']
-        elif owner_data.get('data', {}).get('organization'):
-            owner_id = owner_data['data']['organization']['id']
-        else:
-            raise Exception("Impossible de récupérer l'ID du propriétaire.")
-
-        print(f"Owner ID récupéré : {owner_id}")  # Vérifie que cet ID est correct
-
+        print(f"Owner ID : {owner_id}")
 
         # Creating the project
         create_variables = {
-            "title": "Goals Project",
-            "owner_id": owner_id
+            "title": goals_project_name,
+            "owner_id": owner_id,
+            "repository_id": repository_id
         }
 
 
-        project_response = requests.post(graphql_url,
-                                         json={'query': mutation_create_project, 'variables': create_variables},
-                                         headers=headers)
-        project_data = json.loads(project_response.text)
+        project_data = github_graphql_request(params, mutation_create_project, create_variables)
         # Print the entire response to inspect what GitHub API returned
         print("GitHub API response:", project_data)
 
@@ -331,9 +332,7 @@ def create_project_graphql(params):
             }
 
             # Exécution de la requête
-            response = requests.post(graphql_url, json={"query": mutation_add_field, "variables": variables},
-                                     headers=headers)
-            data = response.json()
+            data = github_graphql_request(params, mutation_add_field, variables)
 
             # Vérification de la réponse
             print("Réponse GitHub:", json.dumps(data, indent=4))
@@ -512,33 +511,6 @@ def create_project_graphql(params):
             #     else:
             #         print(f"✅ Assigné {goal_option_name} à l'issue '{issue['title']}'")
 
-def get_repo_id(headers):
-    graphql_url = 'https://api.github.com/graphql'
-
-    # GraphQL query to get repository owner ID
-    query = """
-    query ($repo_owner: String!, $repo_name: String!) {
-      repository(owner: $repo_owner, name: $repo_name) {
-        owner {
-          id
-          login
-          __typename
-        }
-      }
-    }
-    """
-
-    # Variables for the query
-    variables = {
-        "repo_owner": "Sebastienlejeune",  # e.g., 'octocat'
-        "repo_name": "my-ggi-board"  # e.g., 'Hello-World'
-    }
-
-    # Make the request to GitHub GraphQL API
-    response = requests.post(graphql_url, json={'query': query, 'variables': variables}, headers=headers)
-    response_data = json.loads(response.text)
-    return response_data
-
 def main():
     """
     Main GITHUB.
@@ -548,6 +520,7 @@ def main():
     print("* Using GitHub backend.")
     metadata, init_scorecard = retrieve_env()
     params = retrieve_params()
+    setup_http(params)
 
     setup_github(metadata, params, init_scorecard, args)
 
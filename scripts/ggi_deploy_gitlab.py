@@ -13,6 +13,7 @@ import random
 import urllib.parse
 import gitlab
 from ggi_deploy import *
+from ggi_http import get_session, scheduler, setup_http
 from ggi_utils_gitlab import retrieve_params
 
 
@@ -25,6 +26,7 @@ def main():
     print("* Using GitLab backend.")
     metadata, init_scorecard = retrieve_env()
     params = retrieve_params()
+    setup_http(params)
     setup_gitlab(metadata, params, init_scorecard, args)
 
     print("\nDone.")
@@ -39,12 +41,31 @@ def create_gitlab_label(project, existing_labels, new_label, label_args):
         return
 
     print(f" Create label: {new_label}")
-    project.labels.create(label_args)
+    label = project.labels.create(label_args)
+    existing_labels[new_label] = label.id
+
+
+def create_gitlab_issue(project, activity):
+    """
+    Create an activity issue.
+    Returns None on success, or the error message.
+    """
+    try:
+        project.issues.create({
+            'title': activity['title'],
+            'description': activity['body'],
+            'labels': activity['labels']
+        })
+    except gitlab.exceptions.GitlabError as e:
+        return f"Status: {e.response_code}, Data: {e.error_message}"
+    return None
 
 
 def setup_gitlab(metadata, params: dict, init_scorecard, args: dict):
     """
-    Execute the deployment on a GitLab instance (python-gitlab 7.x).
+    Execute the deployment on a GitLab instance (python-gitlab 7.x):
+    read the current state of the project, plan the operations needed
+    and apply them, unless only asked for the plan.
     """
 
     print(f"\n# Connection to GitLab at {params['GGI_GITLAB_URL']}")
@@ -53,18 +74,51 @@ def setup_gitlab(metadata, params: dict, init_scorecard, args: dict):
     gl = gitlab.Gitlab(
         url=params['GGI_GITLAB_URL'],
         private_token=params['GGI_GITLAB_TOKEN'],
-        per_page=50
+        per_page=50,
+        session=get_session()
     )
 
+    start = scheduler.calls()
     # python-gitlab 7.x: .projects.get() unchanged
     project = gl.projects.get(params['GGI_GITLAB_PROJECT'])
+    snapshot = snapshot_gitlab(project, args)
+    plan = plan_gitlab(project, metadata, params, init_scorecard, args, snapshot)
+    print_plan(plan, scheduler.calls() - start)
+    if not args.opt_plan:
+        apply_plan(plan)
+
+
+def snapshot_gitlab(project, args: dict):
+    """
+    Read in one pass the current state of the parts of the project
+    managed by the deployment.
+    """
+    print("\n# Read current state of the project")
+    snapshot = {}
+    if args.opt_activities or args.opt_board:
+        # python-gitlab 7.x: must specify all=True to list all labels
+        snapshot['labels'] = {l.name: l.id for l in project.labels.list(all=True)}
+    if args.opt_activities:
+        # Activities are matched by title when resuming, whatever the state of their issue.
+        snapshot['issue_titles'] = {i.title for i in project.issues.list(get_all=True, per_page=100)}
+    if args.opt_board:
+        snapshot['boards'] = [b.name for b in project.boards.list(all=True)]
+    if args.opt_schedulepipeline:
+        snapshot['schedules'] = len(project.pipelineschedules.list(all=True))
+    return snapshot
+
+
+def plan_gitlab(project, metadata, params: dict, init_scorecard, args: dict, snapshot: dict):
+    """
+    Diff the desired state of the project against its snapshot, and
+    return the operations needed to reconcile them.
+    """
+    plan = []
 
     # ----------------------------------------------------------------------
     # Update project description
     # ----------------------------------------------------------------------
     if args.opt_projdesc:
-        print("\n# Update Project description")
-
         if 'CI_PAGES_URL' not in os.environ:
             print("Cannot find environment variable 'CI_PAGES_URL', skipping.")
         else:
@@ -82,123 +136,66 @@ def setup_gitlab(metadata, params: dict, init_scorecard, args: dict):
                 'For more information please see https://ospo-alliance.org/'
             )
 
-            print(f"\nNew description:\n<<<---------\n{desc}\n--------->>>\n")
+            if project.description != desc:
+                print(f"\nNew description:\n<<<---------\n{desc}\n--------->>>\n")
 
-            project.description = desc
-            project.save()
+                def apply_description():
+                    project.description = desc
+                    project.save()
+                plan.append(plan_op('~', 'description', params['GGI_GITLAB_PROJECT'], 1, apply_description))
 
     # ----------------------------------------------------------------------
     # Labels and activities
     # ----------------------------------------------------------------------
+    planned_labels = set()
     if args.opt_activities:
-
-        print("\n# Manage labels")
-
-        # python-gitlab 7.x: must specify all=True to list all labels
-        existing_labels = [l.name for l in project.labels.list(all=True)]
-
-        # Role labels
-        print("\n Roles labels")
-        for label, color in metadata['roles'].items():
-            create_gitlab_label(
-                project,
-                existing_labels,
-                label,
-                {'name': label, 'color': color}
-            )
-
-        # Progress labels
-        print("\n Progress labels")
-        for name, label in params['progress_labels'].items():
-            create_gitlab_label(
-                project,
-                existing_labels,
-                label,
-                {'name': label, 'color': '#ed9121'}
-            )
-
-        # Goal labels
-        print("\n Goal labels")
-        for goal in metadata['goals']:
-            create_gitlab_label(
-                project,
-                existing_labels,
-                goal['name'],
-                {'name': goal['name'], 'color': goal['colour']}
-            )
-
-        # Create activities
-        print("\n# Create activities.")
-        issues_test = project.issues.list(state='opened', all=True)
-
-        if len(issues_test) > 0:
-            print(" Ignore, Issues already exist")
-        else:
-            for activity in metadata['activities']:
-
-                progress_label = params['progress_labels']['not_started']
-
-                if args.opt_random:
-                    progress_idx = random.choice(
-                        list(params['progress_labels']) + ['none']
-                    )
-                    if progress_idx != 'none':
-                        progress_label = params['progress_labels'][progress_idx]
-
-                labels = [activity['goal']] + activity['roles'] + [progress_label]
-
-                print(f"  - Issue: {activity['name']:<60} Labels: {labels}")
-
-                project.issues.create({
-                    'title': activity['name'],
-                    'description': extract_sections(args, init_scorecard, activity),
-                    'labels': labels
-                })
+        for name, colour in desired_labels(metadata, params):
+            if name not in snapshot['labels']:
+                planned_labels.add(name)
+                plan.append(plan_op('+', 'label', name, 1,
+                                    lambda name=name, colour=colour: create_gitlab_label(
+                                        project, snapshot['labels'], name, {'name': name, 'color': colour})))
+
+        # Create the activities, on a project without issues or when resuming.
+        activities = missing_activities(render_activities(args, params, metadata, init_scorecard),
+                                        snapshot['issue_titles'], args.opt_resume)
+        if activities:
+            todo = len(activities)
+            plan.append(plan_op('+', 'activities', f"{todo} issues", todo,
+                                lambda: create_activities(activities,
+                                                          lambda batch: [create_gitlab_issue(project, a) for a in batch],
+                                                          1, params.get('deploy_workers', default_deploy_workers))))
 
     # ----------------------------------------------------------------------
-    # Create Goals Board
+    # Create Goals Board, with one list per goal label
     # ----------------------------------------------------------------------
-    if args.opt_board:
-        print(f"\n# Create Goals board: {ggi_board_name}")
-
-        # python-gitlab 7.x: list() needs all=True for full listing
-        boards_list = project.boards.list(all=True)
-        board_exists = any(b.name == ggi_board_name for b in boards_list)
+    if args.opt_board and ggi_board_name not in snapshot['boards']:
+        goals = [g['name'] for g in metadata['goals']
+                 if g['name'] in snapshot['labels'] or g['name'] in planned_labels]
 
-        if board_exists:
-            print(" Ignore, Board already exists")
-        else:
+        def apply_board():
+            print(f"\n# Create Goals board: {ggi_board_name}")
             board = project.boards.create({'name': ggi_board_name})
-
-            print('\n# Create Goals board lists.')
-
-            # Build list of label objects for goals
-            all_labels = project.labels.list(all=True)
-
-            for g in metadata['goals']:
-                for lbl in all_labels:
-                    if lbl.name == g['name']:
-                        print(f"  - Create list for {lbl.name}")
-                        board.lists.create({'label_id': lbl.id})
+            for goal in goals:
+                # Label ids are known once the label operations are applied.
+                print(f"  - Create list for {goal}")
+                board.lists.create({'label_id': snapshot['labels'][goal]})
+        plan.append(plan_op('+', 'board', ggi_board_name, 1 + len(goals), apply_board))
 
     # ----------------------------------------------------------------------
     # Nightly pipeline schedule
     # ----------------------------------------------------------------------
-    if args.opt_schedulepipeline:
-        print("\n# Schedule nightly pipeline to refresh the Dashboard")
-
-        schedules = project.pipelineschedules.list(all=True)
-
-        if len(schedules) > 0:
-            print(f" Ignore, already {len(schedules)} scheduled pipeline(s)")
-        else:
+    if args.opt_schedulepipeline and snapshot['schedules'] == 0:
+        def apply_schedule():
             sched = project.pipelineschedules.create({
                 'ref': 'main',
                 'description': 'Nightly Update',
                 'cron': '0 3 * * *'
             })
             print(f" Pipeline created: '{sched.description}'")
+        plan.append(plan_op('+', 'schedule', 'Nightly Update', 1, apply_schedule))
 
+    return plan
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
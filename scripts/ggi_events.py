@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+Query the local store of label events filled by the website updates.
+
+Events are printed as CSV, with the columns of labels_hist.csv, by time.
+Without a project, the only project of the store is used.
+
+usage: ggi_events [-h] [-f FILE] [-p PROJECT] [-d DAYS] [-s SINCE] [-u UNTIL] [-i ISSUE]
+
+optional arguments:
+  -h, --help                  Show this help message and exit
+  -f, --file FILE             Event store (default: `event_store` in conf/ggi_deployment.json)
+  -p, --project PROJECT       Project of the events
+  -d, --days DAYS             Events of the last DAYS days
+  -s, --since SINCE           Events since this date (ISO 8601)
+  -u, --until UNTIL           Events before this date (ISO 8601)
+  -i, --issue ISSUE           Events of a single issue
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from ggi_update_website import EventStore, default_event_store, file_conf, hist_cols
+
+
+def parse_args():
+    """
+    Parse arguments from command line.
+    """
+    parser = argparse.ArgumentParser(description="Query the local store of label events.")
+    parser.add_argument('-f', '--file',
+                        dest='file',
+                        default=None,
+                        help='Event store (default: `event_store` in conf/ggi_deployment.json).')
+    parser.add_argument('-p', '--project',
+                        dest='project',
+                        default=None,
+                        help='Project of the events.')
+    parser.add_argument('-d', '--days',
+                        dest='days',
+                        type=int,
+                        default=None,
+                        help='Events of the last DAYS days.')
+    parser.add_argument('-s', '--since',
+                        dest='since',
+                        default=None,
+                        help='Events since this date (ISO 8601).')
+    parser.add_argument('-u', '--until',
+                        dest='until',
+                        default=None,
+                        help='Events before this date (ISO 8601).')
+    parser.add_argument('-i', '--issue',
+                        dest='issue',
+                        type=int,
+                        default=None,
+                        help='Events of a single issue.')
+    return parser.parse_args()
+
+
+def main():
+    """
+    Main sequence.
+    """
+    args = parse_args()
+    file_store = args.file
+    if file_store is None:
+        with open(file_conf, 'r', encoding='utf-8') as f:
+            file_store = json.load(f).get('event_store', default_event_store)
+    if not file_store or not os.path.isfile(file_store):
+        print(f"No event store found at {file_store}.")
+        exit(1)
+
+    store = EventStore(file_store)
+    project = args.project
+    if project is None:
+        projects = [row[0] for row in store.db.execute("SELECT DISTINCT project FROM events")]
+        if len(projects) != 1:
+            print(f"Use -p to select a project among: {', '.join(projects)}.")
+            exit(1)
+        project = projects[0]
+
+    since = args.since
+    if args.days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=args.days)
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(hist_cols)
+    writer.writerows(store.changes(project, since, args.until, args.issue))
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
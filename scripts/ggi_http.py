@@ -0,0 +1,710 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+HTTP layer shared by all calls to the forges.
+
+All clients (PyGithub, python-gitlab, raw requests) go through a single
+pooled `requests.Session`. GET responses carrying an `ETag` or a
+`Last-Modified` header are stored in an on-disk cache, and replayed when
+the server answers a conditional request with `304 Not Modified`.
+Exchanges can also be recorded to a cassette, and served back from it to
+reproduce a run without network.
+"""
+
+import atexit
+import base64
+import collections
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import timedelta
+
+import requests
+
+# Default location and size of the HTTP cache.
+default_http_cache_dir = '.ggi_cache/http'
+default_http_cache_max_mb = 100
+
+# Size of the shared connection pool.
+default_pool_size = 16
+
+# Default pacing of the requests: maximum number of requests per second
+# and per host, minimum interval in seconds between two writes to GitHub,
+# number of retries and base backoff in seconds for rate-limited requests.
+default_http_max_rate = 10
+default_http_write_interval = 1.0
+default_http_max_retries = 3
+default_http_backoff = 60
+
+# Timeout of GraphQL requests, in seconds (connection, response).
+default_graphql_timeout = (10, 60)
+# Retries of GraphQL requests on network and server errors, and the
+# initial delay between them, in seconds (doubled at each retry).
+default_graphql_max_retries = 3
+default_graphql_backoff = 1
+
+# Window of the rate limit budget simulated when replaying a cassette.
+replay_rate_limit_window = 3600
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket pacing requests at a given rate, with bursts.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, sleeping until one is available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Tokens are reserved even if not yet available, so that
+            # concurrent callers are served in turn.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """
+    Scheduler for all the calls made to the forges.
+
+    It tracks, per host, the number of calls and the remaining rate limit
+    budget from the response headers (X-RateLimit-* on GitHub, RateLimit-*
+    on GitLab). GitHub has separate budgets per resource (core, graphql,
+    search...), named by X-RateLimit-Resource, which are tracked apart.
+    Requests are paced with token buckets: one for reads, and on GitHub
+    hosts a slower one for writes, as GitHub recommends to space
+    content-creating requests. Hosts are recognised as GitHub from their
+    responses. When the budget is exhausted, requests wait for the reset.
+    Rate-limited responses (429, or 403 from GitHub secondary rate limits)
+    are retried after `Retry-After`, or after an exponential backoff with
+    jitter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts = {}
+        self.configure({})
+
+    def configure(self, params: dict):
+        self.max_rate = params.get('http_max_rate', default_http_max_rate)
+        self.write_interval = params.get('http_write_interval', default_http_write_interval)
+        self.max_retries = params.get('http_max_retries', default_http_max_retries)
+        with self._lock:
+            self.hosts = {}
+
+    def _host(self, url: str):
+        host = urllib.parse.urlsplit(url).hostname
+        with self._lock:
+            if host not in self.hosts:
+                self.hosts[host] = {
+                    'calls': 0, 'github': False, 'budgets': {},
+                    'reads': TokenBucket(self.max_rate, self.max_rate),
+                    'writes': TokenBucket(1 / self.write_interval, 1) if self.write_interval else None,
+                }
+            return self.hosts[host]
+
+    @staticmethod
+    def resource(request, stats: dict):
+        """
+        Tell which rate limit budget of its host a request uses: GitHub
+        counts GraphQL and search requests apart from the others.
+        """
+        if not stats['github']:
+            return 'core'
+        path = urllib.parse.urlsplit(request.url).path
+        if path.endswith('/graphql'):
+            return 'graphql'
+        if '/search/' in path:
+            return 'search'
+        return 'core'
+
+    @staticmethod
+    def is_write(request):
+        """
+        Tell if a request creates or modifies content. GraphQL queries
+        are sent with POST, but only mutations are writes.
+        """
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return False
+        if request.url.endswith('/graphql') and request.body:
+            body = request.body if isinstance(request.body, bytes) else request.body.encode('utf-8')
+            try:
+                return json.loads(body).get('query', '').lstrip().startswith('mutation')
+            except ValueError:
+                return True
+        return True
+
+    def wait(self, request):
+        """
+        Wait until the request can be sent.
+        """
+        stats = self._host(request.url)
+        resource = self.resource(request, stats)
+        budget = stats['budgets'].get(resource, {})
+        if budget.get('remaining') == 0 and budget.get('reset') is not None:
+            delay = budget['reset'] - time.time() + 1
+            if delay > 0:
+                print(f"# Rate limit budget ({resource}) exhausted on "
+                      f"{urllib.parse.urlsplit(request.url).hostname}, waiting {delay:.0f}s for the reset.")
+                time.sleep(delay)
+        if self.is_write(request) and stats['github'] and stats['writes'] is not None:
+            stats['writes'].acquire()
+        else:
+            stats['reads'].acquire()
+
+    def update(self, request, response, attempt: int):
+        """
+        Record the rate limit headers of a response.
+
+        Returns the delay to wait before retrying the request if it was
+        rate limited, None otherwise.
+        """
+        stats = self._host(request.url)
+        headers = response.headers
+        # GitHub uses X-RateLimit-*, GitLab uses RateLimit-*.
+        remaining = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+        limit = headers.get('X-RateLimit-Limit', headers.get('RateLimit-Limit'))
+        reset = headers.get('X-RateLimit-Reset', headers.get('RateLimit-Reset'))
+        with self._lock:
+            stats['calls'] += 1
+            if 'X-GitHub-Request-Id' in headers:
+                stats['github'] = True
+            resource = headers.get('X-RateLimit-Resource') or self.resource(request, stats)
+            budget = stats['budgets'].setdefault(resource, {'remaining': None, 'limit': None, 'reset': None})
+            if remaining is not None:
+                budget['remaining'] = int(remaining)
+            if limit is not None:
+                budget['limit'] = int(limit)
+            if reset is not None:
+                budget['reset'] = int(reset)
+
+        if response.status_code not in (403, 429):
+            return None
+        if response.status_code == 403 and 'Retry-After' not in headers and remaining != '0' \
+                and b'secondary rate limit' not in response.content:
+            # A genuine permission error.
+            return None
+        if 'Retry-After' in headers:
+            return int(headers['Retry-After'])
+        if remaining == '0' and reset is not None:
+            return max(int(reset) - time.time(), 0) + 1
+        delay = default_http_backoff * 2 ** attempt
+        return delay + random.uniform(0, delay / 4)
+
+    def budget(self, host: str = None):
+        """
+        Return the number of calls and the current rate limit budgets, per
+        host, or for one host. Budgets are given per resource.
+        """
+        with self._lock:
+            budget = {h: {'calls': s['calls'],
+                          'budgets': {r: dict(b) for r, b in s['budgets'].items()}}
+                      for h, s in self.hosts.items()}
+        return budget.get(host) if host is not None else budget
+
+    def calls(self):
+        """
+        Total number of API calls made so far.
+        """
+        with self._lock:
+            return sum(stats['calls'] for stats in self.hosts.values())
+
+
+scheduler = RequestScheduler()
+
+
+class HttpCache:
+    """
+    On-disk cache of GET responses, keyed by URL and authentication scope.
+
+    Each entry is a single file: a JSON header line (url, status, headers)
+    followed by the raw body. When the cache grows over its maximum size,
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(e.stat().st_size for e in os.scandir(cache_dir) if e.is_file())
+
+    @staticmethod
+    def key(request):
+        """
+        Compute the cache key of a request. Tokens are hashed with the URL,
+        so that responses are never shared between authentication scopes.
+        """
+        h = hashlib.sha256()
+        for part in (request.method, request.url,
+                     request.headers.get('Accept', ''),
+                     request.headers.get('Authorization', ''),
+                     request.headers.get('PRIVATE-TOKEN', '')):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def get(self, key: str):
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # Record the access for LRU eviction.
+        os.utime(path)
+        return meta, body
+
+    def count(self, hit: bool):
+        """
+        Count a revalidated response (hit) or a full one (miss). Called
+        from the fetch workers concurrently.
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key: str, meta: dict, body: bytes):
+        path = os.path.join(self.cache_dir, key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(body)
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.isfile(path) else 0
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache is back
+        under 90% of its maximum size.
+        """
+        entries = sorted((e for e in os.scandir(self.cache_dir)
+                          if e.is_file() and not e.name.endswith('.tmp')),
+                         key=lambda e: e.stat().st_mtime)
+        for e in entries:
+            if self._size <= self.max_size * 0.9:
+                break
+            size = e.stat().st_size
+            os.remove(e.path)
+            self._size -= size
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """
+    Raised when replaying a request that is not in the cassette.
+    """
+
+
+class Cassette:
+    """
+    Recording of the HTTP exchanges of a run, to replay it without network.
+
+    The cassette is a gzipped JSON Lines file, with one exchange per line:
+    request key (method, URL and hash of the body), status, headers, body
+    and elapsed time. Authentication headers are neither recorded nor
+    matched, so that a run can be replayed with any token. Responses to
+    the same request are served in the recorded order, the last one being
+    repeated.
+
+    When replaying, a fixed `latency` in seconds (or 'recorded', for the
+    recorded times) can be added to each response, and a `rate_limit`
+    budget per hour can be simulated in the rate limit headers.
+    """
+
+    def __init__(self, file_cassette: str, mode: str, latency=None, rate_limit: int = None):
+        self.file_cassette = file_cassette
+        self.mode = mode
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self.entries = {}
+        if mode == 'record':
+            if os.path.dirname(file_cassette):
+                os.makedirs(os.path.dirname(file_cassette), exist_ok=True)
+            self._file = gzip.open(file_cassette, 'wt', encoding='utf-8')
+            atexit.register(self.close)
+        else:
+            self._load()
+            self.remaining = rate_limit
+            self.reset = time.time() + replay_rate_limit_window
+
+    def _load(self):
+        with gzip.open(self.file_cassette, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries.setdefault(entry['key'], collections.deque()).append(entry)
+                    self.count += 1
+            except (EOFError, ValueError):
+                # The recording run was interrupted: keep the complete lines.
+                print(f"# Cassette {self.file_cassette} is truncated, using its first {self.count} exchanges.")
+
+    @staticmethod
+    def key(request):
+        """
+        Compute the key of a request, independent of the order of the
+        query parameters.
+        """
+        split = urllib.parse.urlsplit(request.url)
+        query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(split.query, keep_blank_values=True)))
+        key = f"{request.method} {urllib.parse.urlunsplit(split._replace(query=query))}"
+        if request.body:
+            body = request.body if isinstance(request.body, bytes) else request.body.encode('utf-8')
+            key += ' ' + hashlib.sha256(body).hexdigest()[:16]
+        return key
+
+    def record(self, request, response):
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding',
+                                        'connection', 'set-cookie')}
+        entry = {'key': self.key(request), 'status': response.status_code, 'reason': response.reason,
+                 'headers': headers, 'elapsed': round(response.elapsed.total_seconds(), 3)}
+        try:
+            entry['body'] = response.content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(response.content).decode('ascii')
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.count += 1
+
+    def play(self, request):
+        """
+        Build the recorded response to a request.
+        """
+        with self._lock:
+            entries = self.entries.get(self.key(request))
+            if not entries:
+                raise CassetteMiss(f"No response recorded in {self.file_cassette} for "
+                                   f"{request.method} {request.url}.", request=request)
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+            headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+            if self.rate_limit is not None:
+                if time.time() >= self.reset:
+                    self.remaining = self.rate_limit
+                    self.reset = time.time() + replay_rate_limit_window
+                self.remaining = max(self.remaining - 1, 0)
+                prefix = '' if 'RateLimit-Remaining' in headers else 'X-'
+                headers[f'{prefix}RateLimit-Limit'] = str(self.rate_limit)
+                headers[f'{prefix}RateLimit-Remaining'] = str(self.remaining)
+                headers[f'{prefix}RateLimit-Reset'] = str(int(self.reset))
+
+        latency = entry['elapsed'] if self.latency == 'recorded' else self.latency
+        if latency:
+            time.sleep(latency)
+        body = base64.b64decode(entry['body_b64']) if 'body_b64' in entry else entry['body'].encode('utf-8')
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = headers
+        response.encoding = requests.utils.get_encoding_from_headers(headers)
+        response.url = request.url
+        response.request = request
+        response.raw = io.BytesIO(body)
+        response._content = body
+        response.elapsed = timedelta(seconds=latency or 0)
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                print(f"# Recorded {self.count} HTTP exchanges to {self.file_cassette}.")
+
+
+class ForgeAdapter(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter used for all calls to the forges.
+
+    Requests go through the scheduler, and GET requests are sent as
+    conditional requests when a cached response exists: the cached body
+    is served when the server answers 304 Not Modified. Responses are
+    recorded to the cassette if any, or served from it when replaying.
+    """
+
+    def __init__(self, cache: HttpCache = None, cassette: Cassette = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.cassette = cassette
+
+    def _send_scheduled(self, request, **kwargs):
+        attempt = 0
+        while True:
+            scheduler.wait(request)
+            response = super().send(request, **kwargs)
+            delay = scheduler.update(request, response, attempt)
+            if delay is None or attempt >= scheduler.max_retries:
+                return response
+            print(f"# Rate limited on {urllib.parse.urlsplit(request.url).hostname} "
+                  f"({response.status_code}), retrying in {delay:.0f}s.")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def send(self, request, **kwargs):
+        if self.cassette is None:
+            return self._send_cached(request, **kwargs)
+        if self.cassette.mode == 'replay':
+            # No pacing, unless rate limits are simulated.
+            if self.cassette.rate_limit is not None:
+                scheduler.wait(request)
+            response = self.cassette.play(request)
+            scheduler.update(request, response, 0)
+            return response
+        response = self._send_cached(request, **kwargs)
+        self.cassette.record(request, response)
+        return response
+
+    def _send_cached(self, request, **kwargs):
+        if self.cache is None or request.method != 'GET':
+            return self._send_scheduled(request, **kwargs)
+
+        key = self.cache.key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            meta, body = cached
+            if 'ETag' in meta['headers']:
+                request.headers['If-None-Match'] = meta['headers']['ETag']
+            if 'Last-Modified' in meta['headers']:
+                request.headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = self._send_scheduled(request, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.count(True)
+            # Keep the fresh rate limit headers, along with the cached ones.
+            headers = dict(meta['headers'])
+            headers.update(response.headers)
+            response.status_code = meta['status']
+            response.reason = 'OK'
+            response.headers = requests.structures.CaseInsensitiveDict(headers)
+            response._content = body
+            response._content_consumed = True
+            response.from_cache = True
+        elif response.status_code == 200:
+            self.cache.count(False)
+            if 'ETag' in response.headers or 'Last-Modified' in response.headers:
+                headers = {k: v for k, v in response.headers.items()
+                           if k.lower() not in ('content-encoding', 'content-length',
+                                                'transfer-encoding', 'connection')}
+                self.cache.put(key, {'url': request.url, 'status': 200, 'headers': headers},
+                               response.content)
+        return response
+
+
+def _inject_github_connections():
+    """
+    Make PyGithub use the shared session, through its connection classes.
+    PyGithub is imported here so that GitLab runs do not pay for it.
+    """
+    from github.Requester import (HTTPRequestsConnectionClass,
+                                  HTTPSRequestsConnectionClass, Requester)
+
+    class SharedSessionHTTPSConnection(HTTPSRequestsConnectionClass):
+        """
+        PyGithub connection class using the shared session, so that PyGithub
+        benefits from the connection pool and the HTTP cache.
+        """
+
+        def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+            self.port = port if port else 443
+            self.host = host
+            self.protocol = "https"
+            self.timeout = timeout
+            self.verify = kwargs.get("verify", True)
+            self.session = get_session()
+
+        def close(self):
+            # The shared session outlives PyGithub connections.
+            pass
+
+    class SharedSessionHTTPConnection(HTTPRequestsConnectionClass):
+        """
+        Same as SharedSessionHTTPSConnection, for plain HTTP hosts.
+        """
+
+        def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+            self.port = port if port else 80
+            self.host = host
+            self.protocol = "http"
+            self.timeout = timeout
+            self.verify = kwargs.get("verify", True)
+            self.session = get_session()
+
+        def close(self):
+            pass
+
+    Requester.injectConnectionClasses(SharedSessionHTTPConnection, SharedSessionHTTPSConnection)
+
+
+def _no_auth(request):
+    return request
+
+
+def _new_session(cache, pool_size: int = default_pool_size, cassette: Cassette = None):
+    session = requests.Session()
+    # Disable the fallback to .netrc, as PyGithub does.
+    session.auth = _no_auth
+    adapter = ForgeAdapter(cache, cassette, pool_connections=pool_size,
+                             pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def setup_http(params: dict):
+    """
+    Create the shared session according to the configuration, and make
+    PyGithub use it if it is loaded.
+
+    The cache is stored in `http_cache_dir` (set it to null to disable the
+    cache), and limited to `http_cache_max_mb` megabytes. Up to
+    `http_pool_size` connections are kept open per host. Requests are
+    paced according to `http_max_rate`, `http_write_interval` and
+    `http_max_retries` (see RequestScheduler).
+
+    Exchanges are recorded to the cassette file `http_record`, or replayed
+    from the cassette file `http_replay`, with `http_replay_latency` and
+    `http_replay_rate_limit` (see Cassette). The GGI_HTTP_RECORD and
+    GGI_HTTP_REPLAY environment variables take precedence.
+    """
+    global _session
+    # Finish the recording of a previous setup.
+    if _session is not None and _session.get_adapter('https://').cassette is not None:
+        _session.get_adapter('https://').cassette.close()
+    file_record = os.environ.get('GGI_HTTP_RECORD', params.get('http_record'))
+    file_replay = os.environ.get('GGI_HTTP_REPLAY', params.get('http_replay'))
+    cassette = None
+    if file_record and file_replay:
+        raise Exception("HTTP exchanges cannot be both recorded and replayed.")
+    if file_replay:
+        if not os.path.isfile(file_replay):
+            raise Exception(f"Cannot find cassette {file_replay}.")
+        cassette = Cassette(file_replay, 'replay', params.get('http_replay_latency'),
+                            params.get('http_replay_rate_limit'))
+        print(f"# Replaying {cassette.count} HTTP exchanges from {file_replay}.")
+    elif file_record:
+        print(f"# Recording HTTP exchanges to {file_record}.")
+        cassette = Cassette(file_record, 'record')
+
+    cache_dir = params.get('http_cache_dir', default_http_cache_dir)
+    max_mb = params.get('http_cache_max_mb', default_http_cache_max_mb)
+    cache = None
+    if cache_dir and not file_replay:
+        print(f"# Using HTTP cache in {cache_dir} (max {max_mb} MB).")
+        cache = HttpCache(cache_dir, max_mb * 1024 * 1024)
+
+    scheduler.configure(params)
+    session = _new_session(cache, params.get('http_pool_size', default_pool_size), cassette)
+    with _session_lock:
+        _session = session
+
+    if 'github' in sys.modules:
+        _inject_github_connections()
+    return session
+
+
+def get_session():
+    """
+    Return the shared session, creating a default one if needed.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _new_session(None)
+    return _session
+
+
+def graphql_request(params: dict, url: str, headers: dict, query: str, variables: dict = None):
+    """
+    Send a GraphQL request to a forge, and return the decoded response,
+    with its data and errors.
+
+    Requests go through the shared session (keep-alive connections, gzip,
+    rate limits), with a timeout of `graphql_timeout`. Queries are retried
+    up to `graphql_max_retries` times with a backoff on network and server
+    errors, mutations only if the connection failed, since they may have
+    been applied otherwise.
+    """
+    headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+    mutation = query.lstrip().startswith('mutation')
+    retryable = (requests.ConnectionError,) if mutation else (requests.ConnectionError, requests.Timeout)
+    max_retries = params.get('graphql_max_retries', default_graphql_max_retries)
+    timeout = params.get('graphql_timeout', default_graphql_timeout)
+    # A [connect, read] pair in the configuration file.
+    timeout = tuple(timeout) if isinstance(timeout, list) else timeout
+    for attempt in range(max_retries + 1):
+        delay = default_graphql_backoff * 2 ** attempt
+        try:
+            response = get_session().post(url, headers=headers,
+                                          json={'query': query, 'variables': variables or {}},
+                                          timeout=timeout)
+        except retryable as e:
+            if attempt == max_retries:
+                raise
+            print(f"# GraphQL request failed ({e.__class__.__name__}), retrying in {delay}s.")
+            time.sleep(delay)
+            continue
+        if response.status_code in (502, 503, 504) and not mutation and attempt < max_retries:
+            print(f"# GraphQL request failed ({response.status_code}), retrying in {delay}s.")
+            time.sleep(delay)
+            continue
+        if response.status_code != 200:
+            raise Exception(f"Query failed with status {response.status_code}: {response.text}")
+        return response.json()
+
+
+def print_http_stats():
+    """
+    Print statistics about the HTTP cache and the rate limits.
+    """
+    adapter = get_session().get_adapter('https://')
+    if adapter.cache is not None:
+        print(f"# HTTP cache: {adapter.cache.hits} hits (304), {adapter.cache.misses} misses.")
+    for host, stats in sorted(scheduler.budget().items()):
+        budgets = ', '.join(f"{resource} {b['remaining']}/{b['limit']}"
+                            for resource, b in sorted(stats['budgets'].items()))
+        print(f"# {host}: {stats['calls']} API calls, remaining budget {budgets or 'unknown'}.")
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+Report the import time of the GGI scripts.
+
+Each module is imported in a fresh interpreter with `-X importtime`, and
+its total import time is printed with the heaviest packages it loads.
+With a maximum time, the script fails if a module takes longer to import,
+so that startup regressions can be caught in CI.
+
+usage: ggi_import_times [-h] [-m MAX_MS] [modules ...]
+
+optional arguments:
+  -h, --help                  Show this help message and exit
+  -m, --max-ms MAX_MS         Fail if a module takes more than MAX_MS ms to import
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Scripts measured by default.
+default_modules = ['ggi_update_website_gitlab', 'ggi_update_website_github',
+                   'ggi_update_fleet', 'ggi_deploy_gitlab', 'ggi_deploy_github']
+
+scripts_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    """
+    Parse arguments from command line.
+    """
+    parser = argparse.ArgumentParser(description="Report the import time of the GGI scripts.")
+    parser.add_argument('-m', '--max-ms',
+                        dest='max_ms',
+                        type=float,
+                        default=None,
+                        help='Fail if a module takes more than MAX_MS ms to import.')
+    parser.add_argument('modules',
+                        nargs='*',
+                        default=default_modules,
+                        help='Modules to import (default: all scripts).')
+    return parser.parse_args()
+
+
+def import_times(module: str):
+    """
+    Import a module in a fresh interpreter, and return the cumulative
+    import time of every module it loaded, in microseconds.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=scripts_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Cannot import {module}: {result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    """
+    Main sequence.
+    """
+    args = parse_args()
+    slow = []
+    print(f"  {'Module':<30} {'Import':>9}  Heaviest packages")
+    for module in args.modules:
+        times = import_times(module)
+        total = times[module] / 1000
+        packages = sorted(((t, name) for name, t in times.items()
+                           if '.' not in name and not name.startswith('ggi_')), reverse=True)
+        heaviest = ', '.join(f"{name} {t / 1000:.0f} ms" for t, name in packages[:3])
+        print(f"  {module:<30} {total:>6.0f} ms  {heaviest}")
+        if args.max_ms is not None and total > args.max_ms:
+            slow.append(module)
+
+    if slow:
+        print(f"Import time above {args.max_ms:.0f} ms for: {', '.join(slow)}.")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
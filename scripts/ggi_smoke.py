@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+Smoke test of the website update entry points.
+
+The main sequences of the GitLab and GitHub updaters are run, as in CI,
+against a fixture board served by the fake forge of ggi_bench, from a
+scratch copy of the repository. Each run must succeed and generate the
+website files. Exits with an error if any run failed.
+
+usage: ggi_smoke [-h] [-s SIZE] [-e EVENTS]
+
+optional arguments:
+  -h, --help                  Show this help message and exit
+  -s, --size SIZE             Number of issues of the board
+  -e, --events EVENTS         Number of label events per issue
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import traceback
+
+from ggi_bench import entry_point, fake_forge, scratch_workdir
+from ggi_update_website import file_conf
+
+# Variants run for each forge: command line options, and configuration.
+variants = [([], {}), (['--stream'], {}), (['--incremental'], {}), ([], {'event_store': None})]
+# Variants of the forges that must generate the same files as the first
+# variant (the fake forge does not serve GitHub GraphQL).
+same_output_variants = {'gitlab': [([], {'gitlab_backend': 'graphql'})], 'github': []}
+# Generated files compared between variants.
+compared_files = ['content/includes/issues.csv', 'content/includes/tasks.csv',
+                  'content/includes/labels_hist.csv']
+
+
+def parse_args():
+    """
+    Parse arguments from command line.
+    """
+    parser = argparse.ArgumentParser(description="Smoke test of the website update.")
+    parser.add_argument('-s', '--size',
+                        dest='size',
+                        type=int,
+                        default=30,
+                        help='Number of issues of the board.')
+    parser.add_argument('-e', '--events',
+                        dest='events',
+                        type=int,
+                        default=6,
+                        help='Number of label events per issue.')
+    return parser.parse_args()
+
+
+def check_website(web_dir: str, size: int):
+    """
+    Check the files generated by a run, and return the problems found.
+    """
+    problems = []
+    includes = f'{web_dir}/content/includes'
+    for file in ('issues.csv', 'tasks.csv', 'labels_hist.csv'):
+        if not os.path.isfile(f'{includes}/{file}'):
+            problems.append(f"{file} is missing")
+    if not problems:
+        with open(f'{includes}/issues.csv', encoding='utf-8') as f:
+            rows = sum(1 for _ in f) - 1
+        if rows != size:
+            problems.append(f"issues.csv has {rows} rows, expected {size}")
+        with open(f'{includes}/labels_hist.csv', encoding='utf-8') as f:
+            if sum(1 for _ in f) <= 1:
+                problems.append("labels_hist.csv has no events")
+    progress = f'{includes}/ggi_data_progress.inc'
+    if not os.path.isfile(progress):
+        problems.append("ggi_data_progress.inc is missing")
+    else:
+        with open(progress, encoding='utf-8') as f:
+            data = json.load(f)
+        if not data['days'] or not any(data['done'] + data['in_progress'] + data['not_started']):
+            problems.append("ggi_data_progress.inc has no progress")
+    time_in_status = f'{includes}/activities_time_in_status.js.inc'
+    if not os.path.isfile(time_in_status):
+        problems.append("activities_time_in_status.js.inc is missing")
+    else:
+        with open(time_in_status, encoding='utf-8') as f:
+            if len(json.load(f)) != size:
+                problems.append("activities_time_in_status.js.inc does not list all activities")
+    if not os.path.isfile(f'{web_dir}/config.toml'):
+        problems.append("config.toml is missing")
+    return problems
+
+
+def smoke_main(backend: str, url: str, args: list, size: int, conf: dict):
+    """
+    Run the main sequence of an updater, and return the problems found
+    and the contents of the compared files.
+    """
+    main, conf, env = entry_point(backend, url, conf)
+    log = io.StringIO()
+    with scratch_workdir(conf, env):
+        argv, sys.argv = sys.argv, [f'ggi_update_website_{backend}.py'] + args
+        try:
+            with contextlib.redirect_stdout(log):
+                main()
+        except BaseException:
+            return [traceback.format_exc()], {}
+        finally:
+            sys.argv = argv
+        web_dir = conf.get('output_dir', 'build/web')
+        problems = check_website(web_dir, size)
+        outputs = {}
+        for file in compared_files:
+            if os.path.isfile(f'{web_dir}/{file}'):
+                with open(f'{web_dir}/{file}', encoding='utf-8') as f:
+                    outputs[file] = f.read()
+    if problems:
+        problems.append(log.getvalue())
+    return problems, outputs
+
+
+def main():
+    """
+    Main sequence.
+    """
+    args = parse_args()
+    with open(file_conf, 'r', encoding='utf-8') as f:
+        conf = json.load(f)
+
+    failures = 0
+    for backend in ('gitlab', 'github'):
+        with fake_forge(backend, args.size, args.events, conf['progress_labels']) as url:
+            reference = None
+            for options, variant_conf in variants + same_output_variants[backend]:
+                problems, outputs = smoke_main(backend, url, options, args.size, dict(conf, **variant_conf))
+                name = ' '.join([f'ggi_update_website_{backend}.py'] + options
+                                + [f'({k}={v})' for k, v in variant_conf.items()])
+                if reference is None:
+                    reference = outputs
+                elif (options, variant_conf) in same_output_variants[backend]:
+                    problems += [f"{file} differs from the first run" for file in compared_files
+                                 if outputs.get(file) != reference.get(file)]
+                print(f"- {name}: {'FAILED' if problems else 'ok'}")
+                for problem in problems:
+                    print(problem)
+                failures += bool(problems)
+
+    if failures:
+        print(f"{failures} runs failed.")
+        exit(1)
+    print("All runs succeeded.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+# ######################################################################
+# Copyright (c) 2025 The OSPO Alliance contributors
+#
+# This program and the accompanying materials are made
+# available under the terms of the Eclipse Public License 2.0
+# which is available at https://www.eclipse.org/legal/epl-2.0/
+#
+# SPDX-License-Identifier: EPL-2.0
+######################################################################
+
+"""
+Update many GGI boards in one process (fleet mode).
+
+The boards are listed in a fleet configuration file (see
+conf/ggi_fleet.example.json), each one with its backend, project and
+output directory. Boards are updated concurrently, sharing the same
+HTTP connection pool, cache and rate limit accounting. Each board gets
+its own website, rendered from the templates in its output directory.
+
+usage: ggi_update_fleet [-h] [-c CONF] [-w WORKERS] [-i]
+
+optional arguments:
+  -h, --help                  Show this help message and exit
+  -c, --conf CONF             Fleet configuration file
+  -w, --workers WORKERS       Number of boards updated concurrently
+  -i, --incremental           Only fetch issues updated since the last run
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ggi_update_website_github as github_updater
+import ggi_update_website_gitlab as gitlab_updater
+import ggi_utils_github
+import ggi_utils_gitlab
+from ggi_http import *
+from ggi_update_website import *
+
+# Define some variables.
+default_fleet_file = 'conf/ggi_fleet.json'
+default_fleet_workers = 4
+
+
+def parse_fleet_args():
+    """
+    Parse arguments from command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Update a fleet of GGI boards.")
+    parser.add_argument('-c', '--conf',
+                        dest='conf',
+                        default=default_fleet_file,
+                        help=f'Fleet configuration file (default: {default_fleet_file}).')
+    parser.add_argument('-w', '--workers',
+                        dest='workers',
+                        type=int,
+                        default=None,
+                        help='Number of boards updated concurrently.')
+    parser.add_argument('-i', '--incremental',
+                        dest='opt_incremental',
+                        action='store_true',
+                        help='Only fetch issues updated since the last run.')
+    return parser.parse_args()
+
+
+def update_board(board: dict, incremental: bool):
+    """
+    Retrieve the issues of a board and generate its website.
+
+    Returns a summary of the run, with the timings of each phase.
+    """
+    summary = {'name': board['name'], 'backend': board['backend'],
+               'issues': 0, 'fetch': 0.0, 'write': 0.0, 'status': 'ok'}
+    start = time.perf_counter()
+    try:
+        web_dir = board.get('output_dir', f"fleet/{board['name']}")
+        print(f"\n# Updating board {board['name']} in {web_dir}.")
+        if board['backend'] == 'github':
+            params = ggi_utils_github.retrieve_params(board)
+            project, ggi_url = params['GGI_GITHUB_PROJECT'], params['GGI_GITHUB_URL']
+            if params.get('github_backend', 'rest') == 'graphql':
+                retrieve_issues = github_updater.retrieve_github_issues_graphql
+            else:
+                retrieve_issues = github_updater.retrieve_github_issues
+        else:
+            params = ggi_utils_gitlab.retrieve_params(board)
+            project, ggi_url = params['GGI_GITLAB_PROJECT'], params['GGI_URL']
+            if params.get('gitlab_backend', 'rest') == 'graphql':
+                retrieve_issues = gitlab_updater.retrieve_gitlab_issues_graphql
+            else:
+                retrieve_issues = gitlab_updater.retrieve_gitlab_issues
+
+        file_cache = board.get('parse_cache_file', f"{web_dir}.ggi_parse_cache.json.gz")
+        parse_cache = load_parse_cache(file_cache, project)
+        if incremental:
+            file_state = board.get('state_file', f"{web_dir}.ggi_state.json")
+            state = load_state(file_state, project)
+            issues, tasks, hist = retrieve_issues(params, state, parse_cache)
+            save_state(file_state, state)
+        else:
+            issues, tasks, hist = retrieve_issues(params, parse_cache=parse_cache)
+        save_parse_cache(file_cache, parse_cache, [i[0] for i in issues])
+        params['event_store'] = board.get('event_store', f"{web_dir}.ggi_events.sqlite")
+        hist = store_events(params, project, issues, hist)
+        summary['issues'] = len(issues)
+        fetched = time.perf_counter()
+        summary['fetch'] = fetched - start
+
+        manifest = load_manifest(web_dir)
+        generate_website(issues, tasks, hist, params, web_dir, manifest)
+        render_templates(web_dir, get_keywords(params, ggi_url), manifest)
+        summary['write'] = time.perf_counter() - fetched
+    except (Exception, SystemExit) as e:
+        # retrieve_params() exits on missing configuration: only skip this board.
+        summary['status'] = f"failed: {e!r}"
+    summary['total'] = time.perf_counter() - start
+    return summary
+
+
+def print_summary(summaries, elapsed: float):
+    """
+    Print the per-board timings of the fleet run.
+    """
+    print("\n# Fleet summary")
+    print(f"  {'Board':<30} {'Backend':<8} {'Issues':>6} {'Fetch':>8} {'Write':>8} {'Total':>8}  Status")
+    for s in summaries:
+        print(f"  {s['name']:<30} {s['backend']:<8} {s['issues']:>6} "
+              f"{s['fetch']:>7.2f}s {s['write']:>7.2f}s {s['total']:>7.2f}s  {s['status']}")
+    print(f"  {len(summaries)} boards updated in {elapsed:.2f}s.")
+
+
+def main():
+    """
+    Main sequence.
+    """
+    args = parse_fleet_args()
+    start = time.perf_counter()
+
+    print(f"# Reading fleet configuration from {args.conf}.")
+    with open(args.conf, 'r', encoding='utf-8') as f:
+        fleet = json.load(f)
+    boards = fleet['boards']
+    workers = args.workers or fleet.get('workers', default_fleet_workers)
+
+    # All boards share the same connection pool, sized for all workers.
+    fleet.setdefault('http_pool_size', workers * fleet.get('fetch_workers', default_fetch_workers))
+    setup_http(fleet)
+
+    print(f"# Updating {len(boards)} boards ({workers} workers).")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(lambda b: update_board(b, args.opt_incremental), boards))
+
+    print_http_stats()
+    print_summary(summaries, time.perf_counter() - start)
+    if any(s['status'] != 'ok' for s in summaries):
+        exit(1)
+    print("Done.")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,9 +18,23 @@ This script:
 """
 
 import argparse
+import csv
+import filecmp
+import glob
+import gzip
+import hashlib
+import json
+import os
+import queue
 import re
-from collections import OrderedDict
-from fileinput import FileInput
+import shutil
+import sqlite3
+import threading
+import io
+from collections import Counter, OrderedDict
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from os import listdir
 from typing import List
 
@@ -28,8 +42,75 @@ from typing import List
 
 file_conf = 'conf/ggi_deployment.json'
 file_meta = 'conf/ggi_activities_metadata.json'
+file_activities = 'conf/ggi_activities_full.json'
 file_json_out = 'ggi_activities_full.json'
 
+# Columns of the issues, tasks and history lists.
+issues_cols = ['issue_id', 'activity_id', 'state', 'title', 'labels',
+               'updated_at', 'url', 'desc', 'workflow', 'tasks_total', 'tasks_done']
+tasks_cols = ['issue_id', 'state', 'task']
+hist_cols = ['time', 'issue_id', 'event_id', 'type', 'author', 'action', 'url']
+# Columns of the issues CSV download.
+issues_csv_cols = ['issue_id', 'activity_id', 'state', 'title', 'labels',
+                   'updated_at', 'url', 'tasks_total', 'tasks_done']
+
+# Default number of concurrent workers used to fetch data from the forge.
+default_fetch_workers = 8
+# Default number of concurrent workers used to write the website files.
+default_write_workers = 8
+
+# Default engine used to aggregate and write the data: 'stdlib' (csv and
+# collections), or 'pandas', which is only imported when selected.
+default_website_engine = 'stdlib'
+
+# Optional columnar outputs written next to the CSV files, if pyarrow is
+# installed: 'parquet' and/or 'arrow' (Arrow IPC file), and their codec.
+default_columnar_formats = []
+default_columnar_compression = 'zstd'
+# Tables of the columnar outputs, with their columns.
+columnar_tables = [('issues', issues_csv_cols), ('tasks', tasks_cols), ('labels_hist', hist_cols)]
+# Types of the columns in the columnar outputs. Categorical columns are
+# dictionary-encoded, and labels are stored as lists of categories.
+columnar_types = {'issue_id': 'int64', 'activity_id': 'category', 'state': 'category',
+                  'title': 'string', 'labels': 'labels', 'updated_at': 'timestamp',
+                  'url': 'string', 'tasks_total': 'int32', 'tasks_done': 'int32',
+                  'task': 'string', 'time': 'timestamp', 'event_id': 'string',
+                  'type': 'category', 'author': 'category', 'action': 'category'}
+# Number of rows buffered before a batch (or Parquet row group) is written.
+columnar_batch_rows = 65536
+
+# Default location of the snapshot used by the incremental mode.
+default_state_file = '.ggi_state.json'
+# Format of the snapshot: snapshots of other formats are not reused.
+# 2: GitHub issues are identified by their number, as in their history.
+state_format = 2
+
+# Number of issues retrieved and processed together by the REST backends.
+default_batch_size = 50
+
+# Number of pages fetched ahead of the website generation in streaming
+# mode, and of issues listed ahead of the label history requests.
+default_pipeline_depth = 2
+
+# Default location of the cache of parsed issue descriptions.
+default_parse_cache_file = '.ggi_cache/parse.json.gz'
+
+# Default location of the local store of label events.
+default_event_store = '.ggi_cache/events.sqlite'
+
+# Website templates (read-only), and default directory of the generated website.
+default_template_dir = 'web'
+default_output_dir = 'build/web'
+# Template files written by the website generation: they are copied to the
+# output directory, other files are hardlinked when possible.
+rendered_paths = ('config.toml', 'content')
+# Manifest of the files written by the generation, with their content hash.
+manifest_file = '.ggi_manifest.json'
+
+# Label actions of GitHub (labeled/unlabeled) and GitLab (add/remove) events.
+label_added_actions = ('labeled', 'add')
+label_removed_actions = ('unlabeled', 'remove')
+
 # Define regexps
 
 # Identify tasks in description:
@@ -52,6 +133,15 @@ def parse_args():
                         dest='opt_verbose',
                         action='store_true',
                         help='More logging.')
+    parser.add_argument('-i', '--incremental',
+                        dest='opt_incremental',
+                        action='store_true',
+                        help='Only fetch issues updated since the last run (see state_file).')
+    parser.add_argument('-s', '--stream',
+                        dest='opt_stream',
+                        action='store_true',
+                        help='Write the issues, tasks and history as they are retrieved, with '
+                             'bounded memory (cannot be combined with --incremental).')
     args = parser.parse_args()
 
     return args
@@ -60,67 +150,825 @@ def parse_args():
 def extract_workflow(activity_desc: str):
     """
     Extract specific sections from an issue description.
+
+    The description is tokenized in a single pass over its lines: only the
+    Description section, and the subsections and tasks of the Scorecard
+    section are kept.
     """
-    paragraphs = activity_desc.split('\n')
-    content_t = 'Introduction'
-    content = OrderedDict()
-    content = {content_t: []}
     a_id = ""
-    for p in paragraphs:
-        activity_id_match = re_activity_id.match(p)
-        if activity_id_match:
-            a_id = activity_id_match.group(1)
-            continue
-        match_section = re.search(re_section, p)
-        if match_section:
-            content_t = match_section.group('section')
-            content[content_t] = []
-        else:
-            content[content_t].append(p)
-    subsection = 'Default'
-    workflow = {subsection: []}
-    # Parse the scorecard section.
+    description = None
+    # Lines of the current section, if it is the description.
+    section = None
+    in_scorecard = False
+    subsection = []
+    workflow = {'Default': subsection}
     tasks = []
-    if 'Scorecard' in content:
-        for p in content['Scorecard']:
-            match_subsection = re.search(re_subsection, p)
-            if match_subsection:
-                subsection = match_subsection.group('subsection')
-                workflow[subsection] = []
-            elif p != '':
-                workflow[subsection].append(p)
+    for line in activity_desc.split('\n'):
+        if line.startswith('Activity ID: '):
+            activity_id_match = re_activity_id.match(line)
+            if activity_id_match:
+                a_id = activity_id_match.group(1)
+                continue
+        if line.startswith('### '):
+            # A section found again replaces the previous one.
+            name = line[4:].rstrip()
+            if name == 'Description':
+                description = []
+                section = description
+            else:
+                section = None
+            in_scorecard = name == 'Scorecard'
+            if in_scorecard:
+                subsection = []
+                workflow = {'Default': subsection}
+                tasks = []
+        elif section is not None:
+            section.append(line)
+        elif in_scorecard:
+            if line.startswith('#### '):
+                subsection = []
+                workflow[line[5:].rstrip()] = subsection
+            elif line != '':
+                subsection.append(line)
                 # Now identify tasks
-                match_tasks = re.search(re_tasks, p)
-                if match_tasks:
-                    is_completed = match_tasks.group('is_completed')
-                    is_completed = True if is_completed == 'x' else False
-                    task = match_tasks.group('task')
-                    tasks.append({'is_completed': is_completed, 'task': task})
+                if '- [' in line:
+                    match_tasks = re_tasks.match(line)
+                    if match_tasks:
+                        tasks.append({'is_completed': match_tasks.group('is_completed') == 'x',
+                                      'task': match_tasks.group('task')})
+    if description is None:
+        raise KeyError('Description')
     # Remove first element (useless html stuff)
     del workflow['Default']
     # Remove last two elements (useless html stuff too)
-    if len(list(workflow)) > 2:
-        del workflow[list(workflow)[-1]][-1]
-        del workflow[list(workflow)[-1]][-1]
-    return a_id, content['Description'], workflow, tasks
+    if len(workflow) > 2:
+        last = workflow[list(workflow)[-1]]
+        del last[-1]
+        del last[-1]
+    return a_id, description, workflow, tasks
+
+
+def load_parse_cache(file_cache: str, project: str):
+    """
+    Read the cache of parsed issue descriptions of a project.
+    Returns an empty cache if there is none, or if it is for another project.
+    """
+    entries = {}
+    if file_cache and os.path.isfile(file_cache):
+        with gzip.open(file_cache, 'rt', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('project') == project:
+            entries = cache['entries']
+    return {'project': project, 'entries': entries, 'hits': 0, 'misses': 0}
+
+
+def save_parse_cache(file_cache: str, parse_cache: dict, issue_ids: List):
+    """
+    Write the cache of parsed issue descriptions (gzip compressed JSON),
+    keeping only the entries of the given issues.
+    """
+    if not file_cache:
+        return
+    keep = {str(i) for i in issue_ids}
+    entries = {k: v for k, v in parse_cache['entries'].items() if k in keep}
+    os.makedirs(os.path.dirname(file_cache) or '.', exist_ok=True)
+    tmp_file = f"{file_cache}.tmp"
+    with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+        json.dump({'project': parse_cache['project'], 'entries': entries}, f, separators=(',', ':'))
+    os.replace(tmp_file, file_cache)
+    print(f"# Parse cache: {parse_cache['hits']} hits, {parse_cache['misses']} misses, "
+          f"{len(parse_cache['entries']) - len(entries)} evicted.")
+
+
+def parse_issue(parse_cache: dict, issue_id, desc: str):
+    """
+    Parse an issue description with extract_workflow, unless the cache
+    holds the result for the same issue and the same description.
+
+    Entries are keyed by the issue id and the hash of the description,
+    so that editing a description always invalidates its entry.
+    """
+    if parse_cache is None or desc is None:
+        return extract_workflow(desc)
+    digest = hashlib.sha256(desc.encode('utf-8')).hexdigest()
+    entry = parse_cache['entries'].get(str(issue_id))
+    if entry is not None and entry[0] == digest:
+        parse_cache['hits'] += 1
+        return tuple(entry[1:])
+    parse_cache['misses'] += 1
+    parsed = extract_workflow(desc)
+    parse_cache['entries'][str(issue_id)] = [digest, *parsed]
+    return parsed
+
+
+def build_issue_record(issue_id, state, title, labels, updated_at, url, desc, parse_cache: dict = None):
+    """
+    Parse an issue description and build its record for the snapshot:
+    the issue row, its task rows, and an (initially empty) label history.
+    """
+    a_id, description, workflow, a_tasks = parse_issue(parse_cache, issue_id, desc)
+    tasks = [[a_id, 'completed' if t['is_completed'] else 'open', t['task']]
+             for t in a_tasks]
+    short_desc = '\n'.join(description)
+    tasks_total = len(a_tasks)
+    tasks_done = len([t for t in a_tasks if t['is_completed']])
+    issue = [issue_id, a_id, state, title, labels,
+             updated_at, url, short_desc, workflow,
+             tasks_total, tasks_done]
+    return {'issue': issue, 'tasks': tasks, 'hist': []}
+
+
+def flatten_records(records: List):
+    """
+    Concatenate issue records into the issues, tasks and history lists.
+    """
+    issues, tasks, hist = [], [], []
+    for record in records:
+        issues.append(record['issue'])
+        tasks.extend(record['tasks'])
+        hist.extend(record['hist'])
+    return issues, tasks, hist
+
+
+class EventStore:
+    """
+    Append-only local store of label events, in SQLite.
+
+    Events are unique by project, issue, time, action and author, so that
+    events fetched again are not duplicated, even when their ids change
+    (the GitHub GraphQL backend only knows node ids, while REST returns
+    numeric ids). Indexes on (issue, time) and on time make the history
+    of issues, or the events of a period, cheap to query. Times are kept
+    as received, and normalised to UTC for ordering.
+    """
+
+    # Version of the schema, recorded in the store (PRAGMA user_version).
+    # 0: events unique by project and event id.
+    version = 1
+    schema = [
+        """CREATE TABLE IF NOT EXISTS events (
+               project TEXT NOT NULL, event_id TEXT NOT NULL, issue_id INTEGER NOT NULL,
+               time TEXT NOT NULL, time_utc TEXT NOT NULL, type TEXT, author TEXT,
+               action TEXT, url TEXT)""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS events_issue_time
+               ON events (project, issue_id, time_utc, action, author)""",
+        "CREATE INDEX IF NOT EXISTS events_time ON events (project, time_utc)",
+    ]
+    columns = 'project, event_id, issue_id, time, time_utc, type, author, action, url'
+
+    def __init__(self, file_store: str):
+        if os.path.dirname(file_store):
+            os.makedirs(os.path.dirname(file_store), exist_ok=True)
+        self.db = sqlite3.connect(file_store)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        old_schema = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'events'").fetchone()
+        with self.db:
+            if old_schema and version < self.version:
+                self.migrate()
+            for statement in self.schema:
+                self.db.execute(statement)
+            self.db.execute(f'PRAGMA user_version = {self.version}')
+
+    def migrate(self):
+        """
+        Rebuild a store of an older version, dropping the events that are
+        duplicates under the new key.
+        """
+        print("# Migrating the event store to the current version.")
+        self.db.execute("ALTER TABLE events RENAME TO events_old")
+        self.db.execute("DROP INDEX IF EXISTS events_issue_time")
+        self.db.execute("DROP INDEX IF EXISTS events_time")
+        for statement in self.schema:
+            self.db.execute(statement)
+        self.db.execute(f"INSERT OR IGNORE INTO events ({self.columns}) "
+                        f"SELECT {self.columns} FROM events_old ORDER BY rowid")
+        self.db.execute("DROP TABLE events_old")
+
+    @staticmethod
+    def utc(value):
+        return to_timestamp(value).astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+    def add(self, project: str, events: List):
+        """
+        Insert events (rows of hist_cols) not already in the store.
+        Returns the number of new events.
+        """
+        rows = [(project, str(e[2]), e[1], e[0] if isinstance(e[0], str) else str(e[0]),
+                 self.utc(e[0]), e[3], e[4], e[5], e[6]) for e in events]
+        with self.db:
+            cursor = self.db.executemany(
+                f"INSERT INTO events ({self.columns}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT DO NOTHING", rows)
+        return cursor.rowcount
+
+    def history(self, project: str, issue_ids: List):
+        """
+        Return the events of the given issues (rows of hist_cols), in the
+        order of the issues, and by time for each issue.
+        """
+        by_issue = {}
+        # Bounded number of parameters by query.
+        for ids in batches(list(dict.fromkeys(issue_ids)), 500):
+            query = ("SELECT time, issue_id, event_id, type, author, action, url FROM events "
+                     f"WHERE project = ? AND issue_id IN ({', '.join('?' * len(ids))}) "
+                     "ORDER BY issue_id, time_utc, rowid")
+            for row in self.db.execute(query, [project] + ids):
+                by_issue.setdefault(row[1], []).append(list(row))
+        return [e for issue_id in issue_ids for e in by_issue.get(issue_id, [])]
+
+    def changes(self, project: str, since, until=None, issue_id: int = None):
+        """
+        Return the events of a project between two dates (rows of hist_cols),
+        by time, optionally for a single issue.
+        """
+        query = "SELECT time, issue_id, event_id, type, author, action, url FROM events WHERE project = ?"
+        args = [project]
+        if issue_id is not None:
+            query += " AND issue_id = ?"
+            args.append(issue_id)
+        if since is not None:
+            query += " AND time_utc >= ?"
+            args.append(self.utc(since))
+        if until is not None:
+            query += " AND time_utc < ?"
+            args.append(self.utc(until))
+        return [list(row) for row in self.db.execute(query + " ORDER BY time_utc, rowid", args)]
+
+    def close(self):
+        self.db.close()
+
+
+def open_event_store(params: dict):
+    """
+    Open the event store set by `event_store`, or return None if disabled.
+    """
+    file_store = params.get('event_store', default_event_store)
+    return EventStore(file_store) if file_store else None
+
+
+def store_events(params: dict, project: str, issues: List, hist: List):
+    """
+    Add the retrieved label events to the event store, and return the
+    history of the issues read back from it. The history is returned
+    unchanged if the store is disabled.
+    """
+    store = open_event_store(params)
+    if store is None:
+        return hist
+    added = store.add(project, hist)
+    hist = store.history(project, [i[0] for i in issues])
+    store.close()
+    print(f"# Event store: {added} new events, {len(hist)} events for {len(issues)} issues.")
+    return hist
+
+
+def store_event_pages(params: dict, project: str, pages):
+    """
+    Same as store_events, for the pages of (records, closed issues)
+    yielded by a backend.
+    """
+    store = open_event_store(params)
+    if store is None:
+        yield from pages
+        return
+    added = 0
+    try:
+        for records, closed in pages:
+            added += store.add(project, [e for r in records for e in r['hist']])
+            hist = store.history(project, [r['issue'][0] for r in records])
+            by_issue = {}
+            for e in hist:
+                by_issue.setdefault(e[1], []).append(e)
+            for record in records:
+                record['hist'] = by_issue.get(record['issue'][0], [])
+            yield records, closed
+    finally:
+        store.close()
+    print(f"# Event store: {added} new events.")
+
+
+def batches(items, size: int):
+    """
+    Group the items of an iterable into lists of at most size items,
+    without consuming more of it than needed.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def collect_pages(pages):
+    """
+    Concatenate the pages of (records, closed issues) yielded by a backend.
+    """
+    records, closed = [], []
+    for page_records, page_closed in pages:
+        records.extend(page_records)
+        closed.extend(page_closed)
+    print(f"  Found {len(records) + len(closed)} issues.")
+    return records, closed
+
+
+def _encode_state(o):
+    if isinstance(o, datetime):
+        return {'__datetime__': o.isoformat()}
+    raise TypeError(f"Cannot serialise {type(o)} in state file.")
+
+
+def _decode_state(d):
+    if '__datetime__' in d:
+        return datetime.fromisoformat(d['__datetime__'])
+    return d
+
+
+def load_state(file_state: str, project: str):
+    """
+    Read the snapshot of the previous run.
+
+    An empty state is returned if there is no snapshot, or if it was
+    recorded for another project or in another format: a full
+    synchronisation is then done.
+    """
+    if not os.path.isfile(file_state):
+        print(f"# No state file found at {file_state}, doing a full sync.")
+        return {}
+    with open(file_state, 'r', encoding='utf-8') as f:
+        state = json.load(f, object_hook=_decode_state)
+    if state.get('project') != project:
+        print(f"# State file {file_state} is for another project, doing a full sync.")
+        return {}
+    if state.get('format') != state_format:
+        print(f"# State file {file_state} is from an older version, doing a full sync.")
+        return {}
+    print(f"# Read state from {file_state}: {len(state['issues'])} issues, "
+          f"last update {state['updated_at']}.")
+    return state
+
+
+def save_state(file_state: str, state: dict):
+    """
+    Write the snapshot for the next incremental run.
+    """
+    print(f"# Writing state to {file_state}.")
+    tmp_file = file_state + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, default=_encode_state)
+    os.replace(tmp_file, file_state)
+
+
+def merge_state(state: dict, project: str, records: List, closed: List, updated_at: str):
+    """
+    Merge the records of updated issues into the snapshot.
+
+    Updated issues replace their previous record in place, new issues are
+    put first (listings are sorted by creation date, newest first), and
+    closed issues are dropped. Returns the merged list of records.
+    """
+    changed = {r['issue'][0]: r for r in records}
+    closed = set(closed)
+    previous = state.get('issues', [])
+    known = {r['issue'][0] for r in previous}
+    merged = [r for r in records if r['issue'][0] not in known]
+    merged += [changed.get(r['issue'][0], r) for r in previous
+               if r['issue'][0] not in closed]
+    state['project'] = project
+    state['format'] = state_format
+    state['issues'] = merged
+    if updated_at is not None and (state.get('updated_at') is None
+                                   or updated_at > state['updated_at']):
+        state['updated_at'] = updated_at
+    state.setdefault('updated_at', None)
+    return merged
+
+
+def map_ordered(func, items, workers: int, executor: ThreadPoolExecutor = None):
+    """
+    Apply func to every item using a bounded pool of threads.
+
+    Results are returned in the same order as the items, whatever
+    the order in which the workers complete. If an executor is given,
+    its threads are used, so that they can be kept from one call to the
+    next (e.g. with their connections); otherwise a pool of workers
+    threads is created for the call.
+    """
+    if executor is not None:
+        return list(executor.map(func, items))
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+        return list(executor.map(func, items))
+
+
+def prefetch(items, depth: int):
+    """
+    Iterate over items in a background thread, at most depth items ahead
+    of the consumer, so that producing the next items overlaps with the
+    processing of the current ones. Errors are raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=max(1, int(depth)))
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        # Give up if the consumer stopped iterating.
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    break
+            else:
+                put((done, None))
+        except BaseException as e:
+            put((done, e))
+        finally:
+            if hasattr(items, 'close'):
+                items.close()
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def load_manifest(web_dir: str):
+    """
+    Read the manifest of the files generated by the previous run in the
+    output directory, and start the manifest of this run.
+    """
+    previous = {}
+    if os.path.isfile(f'{web_dir}/{manifest_file}'):
+        with open(f'{web_dir}/{manifest_file}', 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    return {'web_dir': web_dir, 'previous': previous, 'files': {}, 'written': set()}
+
+
+def save_manifest(manifest: dict, template_dir: str = default_template_dir):
+    """
+    Remove the files generated by the previous run and not by this one
+    (e.g. scorecards of deleted activities), unless they are templates,
+    and save the manifest of this run.
+    """
+    web_dir = manifest['web_dir']
+    stale = [f for f in manifest['previous'] if f not in manifest['files']
+             and not os.path.exists(f'{template_dir}/{f}')]
+    for file in stale:
+        if os.path.isfile(f'{web_dir}/{file}'):
+            os.remove(f'{web_dir}/{file}')
+    tmp_file = f'{web_dir}/{manifest_file}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest['files'], f, indent=2, sort_keys=True)
+    os.replace(tmp_file, f'{web_dir}/{manifest_file}')
+    print(f"\n# Generated {len(manifest['files'])} files: {len(manifest['written'])} written, "
+          f"{len(manifest['files']) - len(manifest['written'])} unchanged, {len(stale)} removed.")
+
+
+def write_generated(file_out: str, content: str, manifest: dict = None):
+    """
+    Write a generated file. With a manifest, the file is only written
+    (atomically) if its content changed since the previous run.
+    """
+    if manifest is None:
+        with open(file_out, 'w') as f:
+            f.write(content)
+        return
+    data = content.encode('utf-8')
+    if not record_generated(manifest, file_out, hashlib.sha256(data).hexdigest()):
+        return
+    os.makedirs(os.path.dirname(file_out), exist_ok=True)
+    with open(f"{file_out}.tmp", 'wb') as f:
+        f.write(data)
+    os.replace(f"{file_out}.tmp", file_out)
+
+
+def record_generated(manifest: dict, file_out: str, digest: str):
+    """
+    Record a generated file in the manifest. Returns False if the file
+    is unchanged since the previous run, and does not need to be written.
+    A file generated again in the same run (e.g. scorecards of duplicate
+    activity ids) is always written, so that its last content wins.
+    """
+    rel_path = os.path.relpath(file_out, manifest['web_dir']).replace(os.sep, '/')
+    again = rel_path in manifest['files']
+    manifest['files'][rel_path] = digest
+    if not again and manifest['previous'].get(rel_path) == digest and os.path.isfile(file_out):
+        return False
+    manifest['written'].add(rel_path)
+    return True
+
+
+class CsvStream:
+    """
+    CSV file written by batches of rows, as pandas would write it.
+
+    Rows go to a temporary file and are hashed on the fly. With a manifest,
+    the file only replaces the previous one if its content changed.
+    """
+
+    def __init__(self, file_out: str, cols: List, manifest: dict = None):
+        self.file_out = file_out
+        self.manifest = manifest
+        self.digest = hashlib.sha256()
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+        os.makedirs(os.path.dirname(file_out), exist_ok=True)
+        self.file = open(f"{file_out}.tmp", 'w', encoding='utf-8', newline='')
+        self.write([cols])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.file.write(data)
+        self.digest.update(data.encode('utf-8'))
+
+    def close(self):
+        self.file.close()
+        if self.manifest is None or record_generated(self.manifest, self.file_out, self.digest.hexdigest()):
+            os.replace(f"{self.file_out}.tmp", self.file_out)
+        else:
+            os.remove(f"{self.file_out}.tmp")
+
+
+def to_timestamp(value):
+    """
+    Convert a date, as returned by the forges (datetime or ISO 8601
+    string), to an aware datetime. Naive dates are taken as UTC.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class ColumnarStream:
+    """
+    Parquet or Arrow IPC file written by batches of rows, with typed columns
+    (see columnar_types).
+
+    Categorical columns are encoded against a dictionary which only grows,
+    so that Arrow IPC files can be written as dictionary deltas. With a
+    manifest, the file only replaces the previous one if it changed.
+    """
+
+    def __init__(self, file_out: str, cols: List, fmt: str,
+                 compression: str = default_columnar_compression, manifest: dict = None):
+        import pyarrow as pa
+        self.pa = pa
+        self.file_out = file_out
+        self.cols = cols
+        self.manifest = manifest
+        self.rows = []
+        self.dictionaries = {col: {} for col in cols if columnar_types[col] in ('category', 'labels')}
+        category = pa.dictionary(pa.int32(), pa.string())
+        types = {'int64': pa.int64(), 'int32': pa.int32(), 'string': pa.string(), 'category': category,
+                 'labels': pa.list_(category), 'timestamp': pa.timestamp('us', tz='UTC')}
+        self.schema = pa.schema([(col, types[columnar_types[col]]) for col in cols])
+        os.makedirs(os.path.dirname(file_out), exist_ok=True)
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(f"{file_out}.tmp", self.schema, compression=compression or 'none')
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self.writer = pa.ipc.new_file(f"{file_out}.tmp", self.schema, options=options)
+
+    def encode(self, col: str, values):
+        dictionary = self.dictionaries[col]
+        indices = [None if v is None else dictionary.setdefault(v, len(dictionary)) for v in values]
+        return self.pa.DictionaryArray.from_arrays(self.pa.array(indices, self.pa.int32()),
+                                                   self.pa.array(list(dictionary), self.pa.string()))
+
+    def column(self, col: str, values):
+        pa = self.pa
+        kind = columnar_types[col]
+        if kind == 'category':
+            return self.encode(col, values)
+        if kind == 'labels':
+            labels = [[label for label in (v or '').split(',') if label] for v in values]
+            offsets = [0]
+            for row in labels:
+                offsets.append(offsets[-1] + len(row))
+            return pa.ListArray.from_arrays(pa.array(offsets, pa.int32()),
+                                            self.encode(col, [label for row in labels for label in row]))
+        if kind == 'timestamp':
+            return pa.array([to_timestamp(v) for v in values], pa.timestamp('us', tz='UTC'))
+        if kind == 'string':
+            return pa.array([None if v is None else str(v) for v in values], pa.string())
+        return pa.array(values, self.schema.field(col).type)
+
+    def write(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= columnar_batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = list(zip(*self.rows))
+        arrays = [self.column(col, values) for col, values in zip(self.cols, columns)]
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        digest = hashlib.sha256()
+        with open(f"{self.file_out}.tmp", 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        if self.manifest is None or record_generated(self.manifest, self.file_out, digest.hexdigest()):
+            os.replace(f"{self.file_out}.tmp", self.file_out)
+        else:
+            os.remove(f"{self.file_out}.tmp")
 
 
-def write_to_csv(issues, tasks, events):
+def sync_file(src: str, dst: str, link: bool):
+    """
+    Make dst identical to src, by hardlinking or copying it, unless
+    it is already. Returns True if dst was updated.
+    """
+    if os.path.exists(dst) and (os.path.samefile(src, dst) or filecmp.cmp(src, dst, shallow=False)):
+        return False
+    tmp_file = f"{dst}.tmp"
+    if os.path.lexists(tmp_file):
+        os.remove(tmp_file)
+    if link:
+        try:
+            os.link(src, tmp_file)
+        except OSError:
+            # Not supported, e.g. across file systems.
+            link = False
+    if not link:
+        shutil.copy2(src, tmp_file)
+    os.replace(tmp_file, dst)
+    return True
+
+
+def render_templates(web_dir: str, keywords: dict = None, manifest: dict = None,
+                     template_dir: str = default_template_dir, workers: int = default_write_workers):
+    """
+    Complete the output directory of the website from the pristine templates.
+
+    Templates are only read: static assets are hardlinked (or copied, e.g.
+    across file systems), files rewritten by the generation are copied, and
+    files using keywords are written with their replacement. Files generated
+    in this run are left alone, and only files that differ are touched.
+    """
+    if os.path.abspath(web_dir) == os.path.abspath(template_dir):
+        print(f"\n# Generating website in place in {template_dir}.")
+        if keywords:
+            update_site_keywords(keywords, web_dir, workers)
+        if manifest:
+            save_manifest(manifest, template_dir)
+        return
+    generated = set(manifest['files']) if manifest else set()
+    keyword_paths = set(keyword_files(template_dir)) if keywords else set()
+    matcher = compile_keywords(keywords) if keywords else None
+    files = []
+    for root, dirs, names in os.walk(template_dir):
+        rel_root = os.path.relpath(root, template_dir)
+        if rel_root == '.':
+            # Skip Hugo output.
+            dirs[:] = [d for d in dirs if d != 'public']
+        os.makedirs(os.path.join(web_dir, rel_root), exist_ok=True)
+        for name in names:
+            rel_path = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, '/')
+            if rel_path not in generated:
+                files.append((rel_path, os.path.join(root, name), os.path.join(web_dir, rel_path)))
+
+    def render(file):
+        rel_path, src, dst = file
+        if rel_path in keyword_paths:
+            return update_keywords(src, keywords, matcher, dst)
+        return sync_file(src, dst, rel_path.split('/')[0] not in rendered_paths)
+
+    updated = map_ordered(render, files, workers)
+    for occurrences in updated:
+        if isinstance(occurrences, list):
+            [print(o) for o in occurrences]
+    print(f"\n# Rendered {len(files)} template files to {web_dir} ({sum(1 for u in updated if u)} updated).")
+    if manifest:
+        save_manifest(manifest, template_dir)
+
+
+def to_columns(rows: List, cols: List):
+    """
+    Build a lightweight table from a list of rows: a dict of columns,
+    supporting the column accesses used by the writers.
+    """
+    return OrderedDict((col, [row[i] for row in rows]) for i, col in enumerate(cols))
+
+
+def columns_to_csv(table: dict, cols: List):
+    """
+    Format the columns of a table as CSV, as pandas would.
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(cols)
+    writer.writerows(zip(*[table[col] for col in cols]))
+    return out.getvalue()
+
+
+def write_to_csv(issues, tasks, events, web_dir: str = 'web', manifest: dict = None):
     """
     Print all issues, tasks and events to CSV files.
 
     CSV files are written directly to the website directory structure,
-    and provided to the user as downloads for further analysis.
+    and provided to the user as downloads for further analysis. Tables are
+    DataFrames, or dicts of columns (see to_columns).
     """
     print("\n# Writing issues and history to files.")
-    issues.to_csv('web/content/includes/issues.csv',
-                  columns=['issue_id', 'activity_id', 'state', 'title', 'labels',
-                           'updated_at', 'url', 'tasks_total', 'tasks_done'], index=False)
-    events.to_csv('web/content/includes/labels_hist.csv', index=False)
-    tasks.to_csv('web/content/includes/tasks.csv', index=False)
+    if isinstance(issues, dict):
+        write_generated(f'{web_dir}/content/includes/issues.csv',
+                        columns_to_csv(issues, issues_csv_cols), manifest)
+        write_generated(f'{web_dir}/content/includes/labels_hist.csv', columns_to_csv(events, hist_cols), manifest)
+        write_generated(f'{web_dir}/content/includes/tasks.csv', columns_to_csv(tasks, tasks_cols), manifest)
+        return
+    write_generated(f'{web_dir}/content/includes/issues.csv',
+                    issues.to_csv(columns=issues_csv_cols, index=False), manifest)
+    write_generated(f'{web_dir}/content/includes/labels_hist.csv', events.to_csv(index=False), manifest)
+    write_generated(f'{web_dir}/content/includes/tasks.csv', tasks.to_csv(index=False), manifest)
+
+
+def open_columnar(params: dict, web_dir: str = 'web', manifest: dict = None):
+    """
+    Open the columnar outputs selected by `columnar_formats`, next to the
+    CSV files. Returns the lists of streams of the issues, tasks and
+    history tables, empty if no format is selected.
+    """
+    formats = params.get('columnar_formats', default_columnar_formats) or []
+    compression = params.get('columnar_compression', default_columnar_compression)
+    streams = ([], [], [])
+    if not formats:
+        return streams
+    for fmt in formats:
+        if fmt not in ('parquet', 'arrow'):
+            raise Exception(f"Unknown columnar format {fmt}, expected 'parquet' or 'arrow'.")
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception("Columnar outputs need pyarrow, install it with `pip install pyarrow`.")
+    print(f"# Writing columnar outputs: {', '.join(formats)}.")
+    for fmt in formats:
+        for (name, cols), outputs in zip(columnar_tables, streams):
+            outputs.append(ColumnarStream(f'{web_dir}/content/includes/{name}.{fmt}',
+                                          cols, fmt, compression, manifest))
+    return streams
+
 
+def write_columnar(issues: List, tasks: List, events: List, params: dict,
+                   web_dir: str = 'web', manifest: dict = None):
+    """
+    Write the issues, tasks and events rows to the columnar outputs
+    selected by `columnar_formats`, if any.
+    """
+    issues_idx = [issues_cols.index(c) for c in issues_csv_cols]
+    rows = ([[row[i] for i in issues_idx] for row in issues], tasks, events)
+    for outputs, table in zip(open_columnar(params, web_dir, manifest), rows):
+        for stream in outputs:
+            stream.write(table)
+            stream.close()
+
+
+def load_columnar(file_in: str):
+    """
+    Load a Parquet or Arrow IPC file written by the website generation,
+    as a pyarrow Table. The file is memory-mapped: columns of uncompressed
+    Arrow IPC files are used without being copied. Use to_pandas() on the
+    result to get a DataFrame with categorical columns.
+    """
+    import pyarrow as pa
+    if file_in.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(file_in, memory_map=True)
+    with pa.memory_map(file_in) as source:
+        return pa.ipc.open_file(source).read_all()
 
-def write_activities_to_md(issues: List):
+
+def write_activities_to_md(issues: List, web_dir: str = 'web', manifest: dict = None):
     # Generate list of current activities
     print("\n# Writing issues.")
 
@@ -161,107 +1009,378 @@ def write_activities_to_md(issues: List):
             my_workflow += '\n\n'
         my_issue.append(f"{my_workflow}")
 
-        filename = f'web/content/scorecards/activity_{activity_id}.md'
-        with open(filename, 'w') as f:
-            f.write('\n'.join(my_issue))
+        filename = f'{web_dir}/content/scorecards/activity_{activity_id}.md'
+        write_generated(filename, '\n'.join(my_issue), manifest)
+
+
+def load_goals(file_in: str = file_activities):
+    """
+    Read the names of the goals, in the order of the dashboard, from the
+    activities metadata.
+    """
+    with open(file_in, 'r', encoding='utf-8') as f:
+        return [goal['name'] for goal in json.load(f)['goals']]
+
+
+def label_index(issues, labels: List):
+    """
+    Parse the comma-separated labels of the issues once into a membership
+    matrix: one row per issue, one boolean column per requested label.
+    """
+    dummies = issues['labels'].fillna('').str.get_dummies(sep=',')
+    return dummies.reindex(columns=labels, fill_value=0).astype(bool)
+
+
+def column_values(table, col: str):
+    """
+    Return the values of a column as a list of plain Python values.
+    """
+    values = table[col]
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def label_stats(issues, statuses: List, goals: List):
+    """
+    Count the issues by status, and by status and goal, using a single
+    membership matrix. Also returns the status of each issue: its first
+    progress label.
+    """
+    membership = label_index(issues, list(OrderedDict.fromkeys(statuses + goals)))
+    by_status = membership[statuses]
+    counts = [int(c) for c in by_status.sum()]
+    goals_stats = by_status.T.astype(int).dot(membership[goals].astype(int))
+    status = by_status.idxmax(axis=1).where(by_status.any(axis=1), 'Unknown')
+    return counts, [[int(c) for c in goals_stats.iloc[i]] for i in range(len(statuses))], status.tolist()
+
+
+def label_stats_stdlib(issues: dict, statuses: List, goals: List):
+    """
+    Same as label_stats, for a dict of columns, without pandas.
+    """
+    counts, pairs, status = Counter(), Counter(), []
+    for labels in issues['labels']:
+        labels = set((labels or '').split(','))
+        present = [s for s in statuses if s in labels]
+        counts.update(present)
+        pairs.update((s, g) for s in present for g in goals if g in labels)
+        status.append(present[0] if present else 'Unknown')
+    return [counts[s] for s in statuses], [[pairs[(s, g)] for g in goals] for s in statuses], status
 
 
-def write_data_points(issues, params):
+def write_data_points(issues, params, web_dir: str = 'web', manifest: dict = None, goals: List = None):
     """
     Generates data points for the various dashboard plots.
     """
+    if goals is None:
+        goals = load_goals()
+    statuses = [params['progress_labels'][p] for p in ('not_started', 'in_progress', 'done')]
 
-    # Identify activities depending on their progress
-    issues_not_started = issues.loc[issues['labels'].str.contains(params['progress_labels']['not_started']),]
-    issues_in_progress = issues.loc[issues['labels'].str.contains(params['progress_labels']['in_progress']),]
-    issues_done = issues.loc[issues['labels'].str.contains(params['progress_labels']['done']),]
+    # Identify activities depending on their progress and goals.
+    if isinstance(issues, dict):
+        counts, goals_stats, status = label_stats_stdlib(issues, statuses, goals)
+    else:
+        counts, goals_stats, status = label_stats(issues, statuses, goals)
+    not_started_stats, in_progress_stats, done_stats = goals_stats
 
     # Generate all activities stats.
-    ggi_data_all_activities = f'[{issues_not_started.shape[0]}, {issues_in_progress.shape[0]}, {issues_done.shape[0]}]'
-    with open('web/content/includes/ggi_data_all_activities.inc', 'w') as f:
-        f.write(ggi_data_all_activities)
-
-    # Generate data points for the dashboard - goals - done
-    done_stats = [
-        int(issues_done['labels'].str.contains('Usage').sum()),
-        int(issues_done['labels'].str.contains('Trust').sum()),
-        int(issues_done['labels'].str.contains('Culture').sum()),
-        int(issues_done['labels'].str.contains('Engagement').sum()),
-        int(issues_done['labels'].str.contains('Strategy').sum())
-    ]
-    with open('web/content/includes/ggi_data_goals_done.inc', 'w') as f:
-        f.write(str(done_stats))
-
-    # Generate data points for the dashboard - goals - in_progress
-    in_progress_stats = [
-        int(issues_in_progress['labels'].str.contains('Usage').sum()),
-        int(issues_in_progress['labels'].str.contains('Trust').sum()),
-        int(issues_in_progress['labels'].str.contains('Culture').sum()),
-        int(issues_in_progress['labels'].str.contains('Engagement').sum()),
-        int(issues_in_progress['labels'].str.contains('Strategy').sum())
-    ]
-    with open('web/content/includes/ggi_data_goals_in_progress.inc', 'w') as f:
-        f.write(str(in_progress_stats))
-
-    # Generate data points for the dashboard - goals - not_started
-    not_started_stats = [
-        int(issues_not_started['labels'].str.contains('Usage').sum()),
-        int(issues_not_started['labels'].str.contains('Trust').sum()),
-        int(issues_not_started['labels'].str.contains('Culture').sum()),
-        int(issues_not_started['labels'].str.contains('Engagement').sum()),
-        int(issues_not_started['labels'].str.contains('Strategy').sum())
-    ]
-    with open('web/content/includes/ggi_data_goals_not_started.inc', 'w') as f:
-        f.write(str(not_started_stats))
+    ggi_data_all_activities = f'[{counts[0]}, {counts[1]}, {counts[2]}]'
+    write_generated(f'{web_dir}/content/includes/ggi_data_all_activities.inc', ggi_data_all_activities, manifest)
 
-    # Generate activities basic statistics, with links to be used from home page.
-    activities_stats = f'Identified {issues.shape[0]} activities overall.\n'
-    activities_stats += f'* {issues_not_started.shape[0]} are <span class="w3-tag w3-light-grey">{params["progress_labels"]["not_started"]}</span>\n'
-    activities_stats += f'* {issues_in_progress.shape[0]} are <span class="w3-tag w3-light-grey">{params["progress_labels"]["in_progress"]}</span>\n'
-    activities_stats += f'* {issues_done.shape[0]} are <span class="w3-tag w3-light-grey">{params["progress_labels"]["done"]}</span>\n'
-    with open('web/content/includes/activities_stats_dashboard.inc', 'w') as f:
-        f.write(activities_stats)
-
-    # Used for the activities table dataset
-    activities_dataset = []
-    for index, issue in issues.iterrows():
-        activity_id = issue['activity_id']
-        title = issue['title']
-        tasks_done = issue['tasks_done']
-        tasks_total = issue['tasks_total']
-        if params['progress_labels']['not_started'] in issue['labels']:
-            status = params['progress_labels']['not_started']
-        elif params['progress_labels']['in_progress'] in issue['labels']:
-            status = params['progress_labels']['in_progress']
-        elif params['progress_labels']['done'] in issue['labels']:
-            status = params['progress_labels']['done']
-        else:
-            status = 'Unknown'
+    # Generate data points for the dashboard - goals - done, in_progress, not_started
+    write_generated(f'{web_dir}/content/includes/ggi_data_goals_done.inc', str(done_stats), manifest)
+    write_generated(f'{web_dir}/content/includes/ggi_data_goals_in_progress.inc', str(in_progress_stats), manifest)
+    write_generated(f'{web_dir}/content/includes/ggi_data_goals_not_started.inc', str(not_started_stats), manifest)
 
-        activities_dataset.append([activity_id, status, title, tasks_done, tasks_total])
+    # Generate activities basic statistics, with links to be used from home page.
+    activities_stats = f'Identified {len(issues["issue_id"])} activities overall.\n'
+    activities_stats += f'* {counts[0]} are <span class="w3-tag w3-light-grey">{params["progress_labels"]["not_started"]}</span>\n'
+    activities_stats += f'* {counts[1]} are <span class="w3-tag w3-light-grey">{params["progress_labels"]["in_progress"]}</span>\n'
+    activities_stats += f'* {counts[2]} are <span class="w3-tag w3-light-grey">{params["progress_labels"]["done"]}</span>\n'
+    write_generated(f'{web_dir}/content/includes/activities_stats_dashboard.inc', activities_stats, manifest)
 
-    with open('web/content/includes/activities.js.inc', 'w') as f:
-        f.write(str(activities_dataset))
+    # Used for the activities table dataset: the first progress label of
+    # each activity is its status.
+    activities_dataset = [list(row) for row in zip(column_values(issues, 'activity_id'), status,
+                                                    column_values(issues, 'title'),
+                                                    column_values(issues, 'tasks_done'),
+                                                    column_values(issues, 'tasks_total'))]
+    write_generated(f'{web_dir}/content/includes/activities.js.inc', str(activities_dataset), manifest)
 
     # Empty (or not) the initialisation banner text in index
     # if at least one activity is started.
-    if issues_not_started.shape[0] < 25:
-        with open('web/content/includes/initialisation.inc', 'w') as f:
-            f.write('')
-
-
-def update_keywords(file_in, keywords):
-    """
-    Reads a file, and replace every occurrence of one keyword with
-    its replacement string.
-    """
-    occurrences = []
-    print(f"\n# Replacing keywords in file {file_in}.")
-    for keyword in keywords:
-        for line in FileInput(file_in, inplace=1, backup='.bak'):
-            if keyword in line:
-                occurrences.append(f'- Changing "{keyword}" to "{keywords[keyword]}" in {file_in}.')
-                line = line.replace(keyword, keywords[keyword])
-            print(line, end='')
-    [print(o) for o in occurrences]
-    print(f'Replacement done for {file_in}.')
+    if counts[0] < 25:
+        write_generated(f'{web_dir}/content/includes/initialisation.inc', '', manifest)
+
+
+class ProgressHistory:
+    """
+    Progress of the activities over time, replayed from their label events:
+    daily counts by status, overall and by goal, and time spent by each
+    activity in each status.
+
+    Each period spent by an issue in a status adds one to the count of the
+    status on the day it starts, and removes one on the day it ends, so
+    that daily counts are the running sums of these changes. Issues can be
+    added, or replaced with a longer history, without replaying the others.
+    """
+
+    def __init__(self, statuses: List, goals: List):
+        self.statuses = statuses
+        self.goals = goals
+        # (day, status, goal or None for all activities) -> count change.
+        self.changes = Counter()
+        self.issues = {}
+
+    def add(self, issues: List, events: List):
+        """
+        Replay the label events (rows of hist_cols) of the given issues
+        (rows of issues_cols), replacing their previous history if any.
+        Events are matched to issues by issue id, which must be the same
+        in both rows.
+        """
+        timed = sorted(((to_timestamp(e[0]), e[1], e[5]) for e in events), key=lambda e: e[0])
+        by_issue = {}
+        for time, issue_id, action in timed:
+            by_issue.setdefault(issue_id, []).append((time, action))
+        for issue in issues:
+            self.replay(issue[0], issue[1], issue[4], by_issue.pop(issue[0], []))
+        if by_issue:
+            print(f"# Progress history: ignored {sum(len(e) for e in by_issue.values())} "
+                  f"label events of {len(by_issue)} unknown issues.")
+
+    def replay(self, issue_id, activity_id: str, labels: str, events: List):
+        """
+        Replay the sorted (time, action) label events of an issue. The
+        status of an issue is its first progress label, as on the dashboard,
+        and its goals are taken from its current labels.
+        """
+        if issue_id in self.issues:
+            self.changes.subtract(self.issues[issue_id]['changes'])
+        labels = set((labels or '').split(','))
+        keys = [None] + [g for g in self.goals if g in labels]
+        present, status, since, periods = set(), None, None, []
+        for time, action in events:
+            verb, _, label = action.partition(' ')
+            if label not in self.statuses:
+                continue
+            if verb in label_added_actions:
+                present.add(label)
+            elif verb in label_removed_actions:
+                present.discard(label)
+            current = next((s for s in self.statuses if s in present), None)
+            if current != status:
+                if status is not None:
+                    periods.append((status, since, time))
+                status, since = current, time
+        if status is not None:
+            periods.append((status, since, None))
+
+        changes = Counter()
+        for status, start, end in periods:
+            for key in keys:
+                changes[(start.date(), status, key)] += 1
+                if end is not None:
+                    changes[(end.date(), status, key)] -= 1
+        self.changes.update(changes)
+        self.issues[issue_id] = {'activity_id': activity_id, 'changes': changes, 'periods': periods}
+
+    def daily_counts(self, end: date = None):
+        """
+        Return the days from the first event to end (today by default), and
+        for each status and goal (None for all activities) the number of
+        activities in that status at the end of each day.
+        """
+        changes = [(k, c) for k, c in self.changes.items() if c]
+        if not changes:
+            return [], {}
+        first = min(k[0] for k, _ in changes)
+        last = max([end or datetime.now(timezone.utc).date()] + [k[0] for k, _ in changes])
+        count = (last - first).days + 1
+        series = {(s, g): [0] * count for s in self.statuses for g in [None] + self.goals}
+        for (day, status, key), change in changes:
+            series[(status, key)][(day - first).days] += change
+        days = [(first + timedelta(days=i)).isoformat() for i in range(count)]
+        return days, {k: list(accumulate(v)) for k, v in series.items()}
+
+    def time_in_status(self, now: datetime = None):
+        """
+        Return, for each activity, the number of days spent in each status
+        (the current period counting until now).
+        """
+        now = now or datetime.now(timezone.utc)
+        rows = []
+        for issue in self.issues.values():
+            seconds = Counter()
+            for status, start, end in issue['periods']:
+                seconds[status] += ((end or now) - start).total_seconds()
+            rows.append([issue['activity_id']] + [round(seconds[s] / 86400, 1) for s in self.statuses])
+        return sorted(rows, key=lambda r: r[0] or '')
+
+
+def progress_history(params, goals: List = None):
+    """
+    Create an empty progress history, for the progress labels and goals.
+    """
+    statuses = [params['progress_labels'][p] for p in ('not_started', 'in_progress', 'done')]
+    return ProgressHistory(statuses, goals if goals is not None else load_goals())
+
+
+def write_progress(history: ProgressHistory, web_dir: str = 'web', manifest: dict = None):
+    """
+    Generates the data points of the progress charts: daily counts by
+    status, overall and by goal, and time spent by activities in each
+    status.
+    """
+    progress = ('not_started', 'in_progress', 'done')
+    days, series = history.daily_counts()
+    data = {'days': days}
+    for p, status in zip(progress, history.statuses):
+        data[p] = series.get((status, None), [])
+    data['goals'] = {g: {p: series.get((status, g), []) for p, status in zip(progress, history.statuses)}
+                     for g in history.goals}
+    write_generated(f'{web_dir}/content/includes/ggi_data_progress.inc', json.dumps(data), manifest)
+    write_generated(f'{web_dir}/content/includes/activities_time_in_status.js.inc',
+                    json.dumps(history.time_in_status()), manifest)
+
+
+def compile_keywords(keywords):
+    """
+    Compile all the keywords into a single regexp. Longest keywords are
+    tried first, so that a keyword prefix of another one never wins.
+    """
+    return re.compile('|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+
+def update_keywords(file_in, keywords, matcher=None, file_out=None):
+    """
+    Reads a file, and replace every occurrence of the keywords with
+    their replacement string, in a single pass over the file.
+
+    The result is written to a temporary file which atomically replaces
+    the original one (or file_out), and only if it changed: unchanged
+    files are left alone. Returns the list of changes done.
+    """
+    if matcher is None:
+        matcher = compile_keywords(keywords)
+    found = {}
+
+    def replace(match):
+        found[match.group(0)] = found.get(match.group(0), 0) + 1
+        return keywords[match.group(0)]
+
+    file_out = file_out or file_in
+    tmp_file = f"{file_out}.tmp"
+    with open(file_in, 'r', encoding='utf-8') as f_in, open(tmp_file, 'w', encoding='utf-8') as f_out:
+        for line in f_in:
+            f_out.write(matcher.sub(replace, line))
+    if (file_out == file_in and not found) or \
+            (os.path.isfile(file_out) and filecmp.cmp(tmp_file, file_out, shallow=False)):
+        os.remove(tmp_file)
+        return []
+    shutil.copymode(file_in, tmp_file)
+    os.replace(tmp_file, file_out)
+    return [f'- Changing "{k}" to "{keywords[k]}" in {file_out} ({n} times).' for k, n in found.items()]
+
+
+def get_keywords(params: dict, ggi_url: str):
+    """
+    Build the list of keywords to be replaced in the static website.
+    """
+    return {
+        '[GGI_URL]': ggi_url,
+        '[GGI_PAGES_URL]': params['GGI_PAGES_URL'],
+        '[GGI_ACTIVITIES_URL]': params['GGI_ACTIVITIES_URL'],
+        '[GGI_CURRENT_DATE]': str(date.today())
+    }
+
+
+def keyword_files(web_dir: str):
+    """
+    List the files of the static website that use keywords, relative
+    to its directory.
+    """
+    files = ['config.toml', 'content/includes/initialisation.inc', 'content/scorecards/_index.md']
+    files += [f"content/{os.path.basename(file)}" for file in sorted(glob.glob(f"{web_dir}/content/*.md"))
+              if os.path.isfile(file)]
+    return files
+
+
+def update_site_keywords(keywords, web_dir: str = 'web', workers: int = default_write_workers):
+    """
+    Replace keywords in all the files of the static website that use them.
+    Files are processed concurrently, all with the same compiled matcher.
+    """
+    files = [f'{web_dir}/{file}' for file in keyword_files(web_dir)]
+    matcher = compile_keywords(keywords)
+    print(f"\n# Replacing keywords in {len(files)} files.")
+    changes = map_ordered(lambda file: update_keywords(file, keywords, matcher), files, workers)
+    for occurrences in changes:
+        [print(o) for o in occurrences]
+    print(f'Replacement done, {sum(1 for c in changes if c)} files changed.')
+
+
+def generate_website(issues, tasks, hist, params, web_dir: str = 'web', manifest: dict = None):
+    """
+    Write all issues, tasks and events to the website: CSV downloads (and
+    columnar outputs, see open_columnar), scorecards, dashboard data points
+    and progress history. With a manifest, unchanged
+    files are not written again. The data is handled with the standard
+    library, or with pandas if `website_engine` is set to 'pandas'.
+    """
+    write_columnar(issues, tasks, hist, params, web_dir, manifest)
+    history = progress_history(params)
+    history.add(issues, hist)
+    write_progress(history, web_dir, manifest)
+    if params.get('website_engine', default_website_engine) == 'pandas':
+        import pandas as pd
+        issues = pd.DataFrame(issues, columns=issues_cols)
+        tasks = pd.DataFrame(tasks, columns=tasks_cols)
+        hist = pd.DataFrame(hist, columns=hist_cols)
+    else:
+        issues = to_columns(issues, issues_cols)
+        tasks = to_columns(tasks, tasks_cols)
+        hist = to_columns(hist, hist_cols)
+
+    write_to_csv(issues, tasks, hist, web_dir, manifest)
+    write_activities_to_md(issues, web_dir, manifest)
+    write_data_points(issues, params, web_dir, manifest)
+
+
+def generate_website_stream(pages, params, web_dir: str = 'web', manifest: dict = None):
+    """
+    Same as generate_website, for the pages of (records, closed issues)
+    yielded by a backend, with bounded memory.
+
+    Pages are retrieved in the background, at most `pipeline_depth` pages
+    ahead, while CSV rows and scorecards of the previous ones are written.
+    Only the issue rows, without their description and workflow, are kept
+    for the dashboard data points. Returns the ids of the issues.
+    """
+    print("\n# Writing issues and history to files as they are retrieved.")
+    issues_idx = [issues_cols.index(c) for c in issues_csv_cols]
+    issues_csv = CsvStream(f'{web_dir}/content/includes/issues.csv', issues_csv_cols, manifest)
+    hist_csv = CsvStream(f'{web_dir}/content/includes/labels_hist.csv', hist_cols, manifest)
+    tasks_csv = CsvStream(f'{web_dir}/content/includes/tasks.csv', tasks_cols, manifest)
+    issues_col, tasks_col, hist_col = open_columnar(params, web_dir, manifest)
+    history = progress_history(params)
+    summary = []
+    for records, closed in prefetch(pages, params.get('pipeline_depth', default_pipeline_depth)):
+        issues, tasks, hist = flatten_records(records)
+        history.add(issues, hist)
+        issues_rows = [[row[i] for i in issues_idx] for row in issues]
+        for stream in [issues_csv] + issues_col:
+            stream.write(issues_rows)
+        for stream in [hist_csv] + hist_col:
+            stream.write(hist)
+        for stream in [tasks_csv] + tasks_col:
+            stream.write(tasks)
+        write_activities_to_md(to_columns(issues, issues_cols), web_dir, manifest)
+        # Description and workflow are not needed anymore.
+        summary.extend(row[:7] + ['', None] + row[9:] for row in issues)
+    for stream in [issues_csv, hist_csv, tasks_csv] + issues_col + tasks_col + hist_col:
+        stream.close()
+    print(f"  Found {len(summary)} open issues.")
+
+    write_data_points(to_columns(summary, issues_cols), params, web_dir, manifest)
+    write_progress(history, web_dir, manifest)
+    return [row[0] for row in summary]
@@ -12,56 +12,64 @@
 """
 
 """
-import glob
-from datetime import date
+import threading
+from datetime import datetime
 
-import pandas as pd
+from github.Issue import Issue
 
+from ggi_http import *
 from ggi_update_website import *
-from ggi_utils_github import *
+from ggi_utils_github import Auth, Github, get_authent, github_api_url, github_graphql, retrieve_params
 
 
-def retrieve_github_issues(params: dict):
-    print(f"\n# Retrieving project from GitHub at {params['GGI_GITHUB_URL']}.")
+def connect_github(params: dict):
+    """
+    Open a connection to the GitHub instance (public or on-premises).
+    """
     # Using an access token
     auth = Auth.Token(params['GGI_GITHUB_TOKEN'])
+    # Requests are paced by the shared scheduler, not by PyGithub.
+    pacing = {'seconds_between_requests': 0, 'seconds_between_writes': 0}
     if params['GGI_API_URL'] is None:
-        g = Github(auth=auth)
-    else:
-        g = Github(auth=auth, base_url=params['GGI_API_URL'])
-    repo = g.get_repo(params["GGI_GITHUB_PROJECT"])
+        return Github(auth=auth, **pacing)
+    return Github(auth=auth, base_url=params['GGI_API_URL'], **pacing)
+
 
+def iter_github_issues(params: dict, since: str = None, parse_cache: dict = None):
     """
-    Retrieve issues from GitHub instance.
+    Retrieve issues from GitHub instance, page by page.
+
+    Issues are listed lazily, and the label history of the issues of each
+    page is fetched by a bounded pool of workers (see `fetch_workers` in the
+    configuration file). Each worker uses its own GitHub handle, since
+    PyGithub connections cannot be shared between threads.
+
+    Yields, for each page, the records of the open issues and the ids of
+    the closed ones. If since is set, only issues updated since then are
+    retrieved, whatever their state.
     """
+    print(f"\n# Retrieving project from GitHub at {params['GGI_GITHUB_URL']}.")
+    g = connect_github(params)
+    repo = g.get_repo(params["GGI_GITHUB_PROJECT"])
+
+    if since is None:
+        print("# Fetching issues..")
+        repo_issues = repo.get_issues()
+    else:
+        print(f"# Fetching issues updated since {since}..")
+        repo_issues = repo.get_issues(state='all', since=datetime.fromisoformat(since))
+
+    workers = params.get('fetch_workers', default_fetch_workers)
+    print(f"# Fetching label history ({workers} workers)..")
+    local = threading.local()
 
-    # Define columns for recorded dataframes.
-    issues = []
-    tasks = []
-    hist = []
-
-    print("# Fetching issues..")
-    repo_issues = repo.get_issues()
-
-    print(f"  Found {repo_issues.totalCount} issues.")
-
-    for i in repo_issues:
-        desc = i.body
-        paragraphs = desc.split('\n\n')
-        lines = desc.split('\n')
-        a_id, description, workflow, a_tasks = extract_workflow(desc)
-        for t in a_tasks:
-            tasks.append([a_id,
-                          'completed' if t['is_completed'] else 'open',
-                          t['task']])
-        short_desc = '\n'.join(description)
-        tasks_total = len(a_tasks)
-        tasks_done = len([t for t in a_tasks if t['is_completed']])
-        issues.append([i.id, a_id, i.state, i.title, ','.join([label.name for label in i.labels]),
-                       i.updated_at, i.url, short_desc, workflow,
-                       tasks_total, tasks_done])
-
-        for event in i.get_events():
+    def fetch_label_events(i):
+        if not hasattr(local, 'handle'):
+            local.handle = connect_github(params)
+        # Rebind the issue to this thread's connection without fetching it again.
+        issue = local.handle.create_from_raw_data(Issue, {'url': i.url})
+        lines = []
+        for event in issue.get_events():
             if event.event == "labeled" or event.event == "unlabeled":
                 n_type = 'label'
                 label = event.label.name if event.label else ''
@@ -76,11 +84,179 @@ def retrieve_github_issues(params: dict):
                     n_action,  # Action effectuée (labeled/unlabeled)
                     i.html_url  # URL de l'issue
                 ]
-                hist.append(line)
+                lines.append(line)
+        return lines
+
+    # Issues are listed ahead, while the history of the previous ones is fetched.
+    # The workers, and their handles, are kept for the whole run.
+    depth = params.get('pipeline_depth', default_pipeline_depth) * default_batch_size
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+        for page in batches(prefetch(repo_issues, depth), default_batch_size):
+            closed = [i.number for i in page if i.state != 'open']
+            page = [i for i in page if i.state == 'open']
+            records = []
+            for i in page:
+                records.append(build_issue_record(i.number, i.state, i.title,
+                                                  ','.join([label.name for label in i.labels]),
+                                                  i.updated_at, i.url, i.body, parse_cache))
+            # Results come back in issue order, so the history file stays stable.
+            for record, lines in zip(records, map_ordered(fetch_label_events, page, workers, executor)):
+                record['hist'] = lines
+            yield records, closed
+
+
+def retrieve_github_issues(params: dict, state: dict = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitHub instance (see iter_github_issues).
+
+    If a state is provided, only issues updated since the last recorded
+    update are fetched and merged into it. Descriptions already parsed
+    are taken from parse_cache, if provided (see load_parse_cache).
+    """
+    since = state.get('updated_at') if state else None
+    records, closed = collect_pages(iter_github_issues(params, since, parse_cache))
+
+    if state is not None:
+        updated = len(records)
+        updated_at = max([r['issue'][5] for r in records], default=None)
+        records = merge_state(state, params['GGI_GITHUB_PROJECT'], records, closed,
+                              updated_at.isoformat() if updated_at else None)
+        print(f"  Merged {updated} updated issues, {len(records)} issues in snapshot.")
+
+    return flatten_records(records)
+
+
+# Fields retrieved for label events in GraphQL queries.
+graphql_label_event_fragment = """
+fragment labelEvent on IssueTimelineItems {
+  __typename
+  ... on LabeledEvent { id createdAt actor { login } label { name } }
+  ... on UnlabeledEvent { id createdAt actor { login } label { name } }
+}
+"""
+
+# Query used by the GraphQL backend: issues with their body, labels and
+# label history, newest first.
+graphql_issues_query = """
+query ($owner: String!, $name: String!, $first: Int!, $after: String,
+       $states: [IssueState!], $since: DateTime) {
+  repository(owner: $owner, name: $name) {
+    issues(first: $first, after: $after, states: $states, filterBy: {since: $since},
+           orderBy: {field: CREATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        id number state title body url updatedAt
+        labels(first: 100, orderBy: {field: NAME, direction: ASC}) { nodes { name } }
+        timelineItems(first: 100, itemTypes: [LABELED_EVENT, UNLABELED_EVENT]) {
+          pageInfo { hasNextPage endCursor }
+          nodes { ...labelEvent }
+        }
+      }
+    }
+  }
+}
+""" + graphql_label_event_fragment
+
+# Query used to retrieve the remaining label history of an issue.
+graphql_timeline_query = """
+query ($id: ID!, $after: String) {
+  node(id: $id) {
+    ... on Issue {
+      timelineItems(first: 100, after: $after, itemTypes: [LABELED_EVENT, UNLABELED_EVENT]) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ...labelEvent }
+      }
+    }
+  }
+}
+""" + graphql_label_event_fragment
+
+# Default number of issues retrieved per GraphQL query.
+default_graphql_page_size = 50
 
-        #print(f"- {i.id} - {a_id} - {i.title} - {i.url} - {i.updated_at}.")
 
-    return issues, tasks, hist
+def graphql_query(params: dict, query: str, variables: dict):
+    """
+    Execute a GraphQL query on the GitHub instance and return its data
+    (see github_graphql).
+    """
+    return github_graphql(params, query, variables)
+
+
+def iter_github_issues_graphql(params: dict, since: str = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitHub instance, using the GraphQL API.
+
+    Issues are retrieved with their body, labels and label history in
+    large pages, instead of one REST call per issue for the events. The
+    same pages as iter_github_issues() are yielded, except for the event
+    ids which are GraphQL node ids.
+    """
+    print(f"\n# Retrieving project from GitHub at {params['GGI_GITHUB_URL']} (GraphQL).")
+    owner, name = params['GGI_GITHUB_PROJECT'].split('/')
+    issues_url = f"{github_api_url(params)}/repos/{owner}/{name}/issues"
+    page_size = params.get('graphql_page_size', default_graphql_page_size)
+
+    variables = {'owner': owner, 'name': name, 'first': page_size, 'after': None,
+                 'states': ['OPEN'] if since is None else None, 'since': since}
+    if since is None:
+        print("# Fetching issues..")
+    else:
+        print(f"# Fetching issues updated since {since}..")
+
+    def query_pages():
+        while True:
+            page = graphql_query(params, graphql_issues_query, variables)['repository']['issues']
+            yield page
+            if not page['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = page['pageInfo']['endCursor']
+
+    # Pages are queried ahead, while long histories of the previous ones are completed.
+    for page in prefetch(query_pages(), params.get('pipeline_depth', default_pipeline_depth)):
+        nodes = page['nodes']
+        closed = [n['number'] for n in nodes if n['state'] != 'OPEN']
+        records = []
+        for n in [n for n in nodes if n['state'] == 'OPEN']:
+            record = build_issue_record(n['number'], n['state'].lower(), n['title'],
+                                        ','.join([label['name'] for label in n['labels']['nodes']]),
+                                        datetime.fromisoformat(n['updatedAt']),
+                                        f"{issues_url}/{n['number']}", n['body'], parse_cache)
+            timeline = n['timelineItems']
+            events = list(timeline['nodes'])
+            # Only issues with a long history need more queries.
+            while timeline['pageInfo']['hasNextPage']:
+                data = graphql_query(params, graphql_timeline_query,
+                                     {'id': n['id'], 'after': timeline['pageInfo']['endCursor']})
+                timeline = data['node']['timelineItems']
+                events.extend(timeline['nodes'])
+            for event in events:
+                action = 'labeled' if event['__typename'] == 'LabeledEvent' else 'unlabeled'
+                label = event['label']['name'] if event['label'] else ''
+                user = event['actor']['login'] if event['actor'] else 'unknown'
+                record['hist'].append([datetime.fromisoformat(event['createdAt']), n['number'],
+                                       event['id'], 'label', user, f"{action} {label}", n['url']])
+            records.append(record)
+        yield records, closed
+
+
+def retrieve_github_issues_graphql(params: dict, state: dict = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitHub instance, using the GraphQL API (see
+    iter_github_issues_graphql). State and parse cache are used as in
+    retrieve_github_issues().
+    """
+    since = state.get('updated_at') if state else None
+    records, closed = collect_pages(iter_github_issues_graphql(params, since, parse_cache))
+
+    if state is not None:
+        updated = len(records)
+        updated_at = max([r['issue'][5] for r in records], default=None)
+        records = merge_state(state, params['GGI_GITHUB_PROJECT'], records, closed,
+                              updated_at.isoformat() if updated_at else None)
+        print(f"  Merged {updated} updated issues, {len(records)} issues in snapshot.")
+
+    return flatten_records(records)
 
 
 def main():
@@ -89,26 +265,41 @@ def main():
     """
 
     args = parse_args()
+    if args.opt_stream and args.opt_incremental:
+        print("Options --stream and --incremental cannot be combined.")
+        exit(1)
 
     params = retrieve_params()
+    setup_http(params)
     repo, github_handle, headers = get_authent(params)
 
     print(params)
 
-    issues, tasks, hist = retrieve_github_issues(params)
-
-    # Convert lists to dataframes
-    issues_cols = ['issue_id', 'activity_id', 'state', 'title', 'labels',
-                   'updated_at', 'url', 'desc', 'workflow', 'tasks_total', 'tasks_done']
-    issues = pd.DataFrame(issues, columns=issues_cols)
-    tasks_cols = ['issue_id', 'state', 'task']
-    tasks = pd.DataFrame(tasks, columns=tasks_cols)
-    hist_cols = ['time', 'issue_id', 'event_id', 'type', 'author', 'action', 'url']
-    hist = pd.DataFrame(hist, columns=hist_cols)
+    if params.get('github_backend', 'rest') == 'graphql':
+        retrieve_issues, iter_issues = retrieve_github_issues_graphql, iter_github_issues_graphql
+    else:
+        retrieve_issues, iter_issues = retrieve_github_issues, iter_github_issues
 
-    write_to_csv(issues, tasks, hist)
-    write_activities_to_md(issues)
-    write_data_points(issues, params)
+    file_cache = params.get('parse_cache_file', default_parse_cache_file)
+    parse_cache = load_parse_cache(file_cache, params['GGI_GITHUB_PROJECT'])
+    web_dir = params.get('output_dir', default_output_dir)
+    manifest = load_manifest(web_dir)
+    if args.opt_stream:
+        pages = store_event_pages(params, params['GGI_GITHUB_PROJECT'],
+                                  iter_issues(params, parse_cache=parse_cache))
+        issue_ids = generate_website_stream(pages, params, web_dir, manifest)
+    else:
+        if args.opt_incremental:
+            file_state = params.get('state_file', default_state_file)
+            state = load_state(file_state, params['GGI_GITHUB_PROJECT'])
+            issues, tasks, hist = retrieve_issues(params, state, parse_cache)
+            save_state(file_state, state)
+        else:
+            issues, tasks, hist = retrieve_issues(params, parse_cache=parse_cache)
+        hist = store_events(params, params['GGI_GITHUB_PROJECT'], issues, hist)
+        issue_ids = [i[0] for i in issues]
+        generate_website(issues, tasks, hist, params, web_dir, manifest)
+    save_parse_cache(file_cache, parse_cache, issue_ids)
 
     #
     # Replace URLs, date
@@ -117,26 +308,16 @@ def main():
 
     # List of strings to be replaced.
     print("\n# List of keywords and values:")
-    keywords = {
-        '[GGI_URL]': params['GGI_GITHUB_URL'],
-        '[GGI_PAGES_URL]': params['GGI_PAGES_URL'],
-        '[GGI_ACTIVITIES_URL]': params['GGI_ACTIVITIES_URL'],
-        '[GGI_CURRENT_DATE]': str(date.today())
-    }
+    keywords = get_keywords(params, params['GGI_GITHUB_URL'])
     # Print the list of keywords to be replaced in files.
     [print(f"- {k} {keywords[k]}") for k in keywords.keys()]
 
     print("\n# Replacing keywords in files.")
-    update_keywords('web/config.toml', keywords)
-    update_keywords('web/content/includes/initialisation.inc', keywords)
-    update_keywords('web/content/scorecards/_index.md', keywords)
+    render_templates(web_dir, keywords, manifest)
     # update_keywords('README.md', keywords)
-    files = glob.glob("web/content/*.md")
-    for file in files:
-        if os.path.isfile(file):
-            update_keywords(file, keywords)
+    print_http_stats()
     try:
-        with open('web/content/_index.md', 'r') as file:
+        with open(f'{web_dir}/content/_index.md', 'r') as file:
             file_content = file.read()
             print(file_content)
     except FileNotFoundError:
@@ -9,85 +9,257 @@
 Update static website from GitLab metadata.
 """
 
-import glob
 import json
 import os
-from datetime import date
 
 import gitlab
-import pandas as pd
 
+from ggi_http import *
 from ggi_update_website import *
 from ggi_utils_gitlab import retrieve_params
 
 
-def retrieve_gitlab_issues(params: dict):
+# Maximum page size accepted by the GitLab REST API.
+gitlab_max_per_page = 100
+
+
+def retrieve_label_events(project, iid, web_url):
+    """
+    Retrieve the label history of a GitLab issue.
+
+    The events are listed once, with the maximum page size, and pagination
+    is followed so that long histories are not truncated.
     """
-    Retrieve issues from GitLab instance.
+    lines = []
+    # A lazy issue object does not trigger any API call.
+    i = project.issues.get(iid, lazy=True)
+    for n in i.resourcelabelevents.list(iterator=True, per_page=gitlab_max_per_page):
+        label = n.label['name'] if n.label else ''
+        user = n.user['username'] if n.user else 'unknown'
+        lines.append([n.created_at, iid, n.id, 'label', user,
+                      f"{n.action} {label}", web_url])
+    return lines
+
+
+def iter_gitlab_issues(params: dict, since: str = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitLab instance, page by page.
+
+    Issues are listed with an iterator, and the label history of the issues
+    of each page is fetched concurrently. Yields, for each page, the records
+    of the open issues and the ids of the closed ones. If since is set, only
+    issues updated since then are retrieved, whatever their state.
     """
     print(f"\n# Connection to GitLab at {params['GGI_GITLAB_URL']} - {params['GGI_GITLAB_PROJECT']}.")
-    gl = gitlab.Gitlab(url=params['GGI_GITLAB_URL'], per_page=50, private_token=params['GGI_GITLAB_TOKEN'])
+    gl = gitlab.Gitlab(url=params['GGI_GITLAB_URL'], per_page=50, private_token=params['GGI_GITLAB_TOKEN'],
+                       session=get_session())
     project = gl.projects.get(params['GGI_GITLAB_PROJECT'])
 
-    print("# Fetching issues..")
-    gl_issues = project.issues.list(state='opened', all=True)
-    print(f"  Found {len(gl_issues)} issues.")
+    if since is None:
+        print("# Fetching issues..")
+        gl_issues = project.issues.list(state='opened', iterator=True)
+    else:
+        print(f"# Fetching issues updated since {since}..")
+        gl_issues = project.issues.list(updated_after=since, iterator=True)
+
+    workers = params.get('fetch_workers', default_fetch_workers)
+    print(f"# Fetching label history ({workers} workers)..")
+    # Issues are listed ahead, while the history of the previous ones is fetched.
+    depth = params.get('pipeline_depth', default_pipeline_depth) * default_batch_size
+    # The workers are kept for the whole run.
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+        for page in batches(prefetch(gl_issues, depth), default_batch_size):
+            closed = [i.iid for i in page if i.state != 'opened']
+            page = [i for i in page if i.state == 'opened']
+            records = []
+            for i in page:
+                records.append(build_issue_record(i.iid, i.state, i.title, ','.join(i.labels),
+                                                  issue_timestamp(i.updated_at), i.web_url, i.description,
+                                                  parse_cache))
+            history = map_ordered(lambda i: retrieve_label_events(project, i.iid, i.web_url),
+                                  page, workers, executor)
+            for record, lines in zip(records, history):
+                record['hist'] = lines
+            yield records, closed
+
+
+def retrieve_gitlab_issues(params: dict, state: dict = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitLab instance (see iter_gitlab_issues).
+
+    If a state is provided, only issues updated since the last recorded
+    update are fetched and merged into it. Descriptions already parsed
+    are taken from parse_cache, if provided (see load_parse_cache).
+    """
+    since = state.get('updated_at') if state else None
+    records, closed = collect_pages(iter_gitlab_issues(params, since, parse_cache))
+
+    if state is not None:
+        updated = len(records)
+        updated_at = max([r['issue'][5] for r in records], default=None)
+        records = merge_state(state, params['GGI_GITLAB_PROJECT'], records, closed, updated_at)
+        print(f"  Merged {updated} updated issues, {len(records)} issues in snapshot.")
+
+    return flatten_records(records)
+
+
+# Query used by the GraphQL backend: issues with their description and
+# labels, newest first.
+graphql_issues_query = """
+query ($fullPath: ID!, $first: Int!, $after: String, $state: IssuableState,
+       $updatedAfter: Time) {
+  project(fullPath: $fullPath) {
+    issues(first: $first, after: $after, state: $state, updatedAfter: $updatedAfter,
+           sort: CREATED_DESC) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        iid state title description updatedAt webUrl
+        labels(first: 100) { nodes { title } }
+      }
+    }
+  }
+}
+"""
+
+# Default number of issues retrieved per GraphQL query.
+default_graphql_page_size = 50
 
-    issues, tasks, hist = [], [], []
 
-    for i in gl_issues:
-        desc = i.description
-        a_id, description, workflow, a_tasks = extract_workflow(desc)
-        for t in a_tasks:
-            tasks.append([a_id, 'completed' if t['is_completed'] else 'open', t['task']])
-        short_desc = '\n'.join(description)
-        tasks_total = len(a_tasks)
-        tasks_done = len([t for t in a_tasks if t['is_completed']])
-        issues.append([i.iid, a_id, i.state, i.title, ','.join(i.labels),
-                       i.updated_at, i.web_url, short_desc, workflow,
-                       tasks_total, tasks_done])
+def issue_timestamp(value: str):
+    """
+    Format an issue update time, from the REST API (2024-01-15T10:20:30.123Z)
+    or GraphQL (2024-01-15T10:20:30Z), to the second in UTC
+    (2024-01-15T10:20:30Z): GraphQL has no milliseconds, so that both
+    backends give the same times.
+    """
+    return datetime.fromisoformat(value).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def graphql_query(params: dict, query: str, variables: dict):
+    """
+    Execute a GraphQL query on the GitLab instance and return its data
+    (see graphql_request).
+    """
+    url = params['GGI_GITLAB_URL'].rstrip('/') + '/api/graphql'
+    headers = {'Authorization': f"Bearer {params['GGI_GITLAB_TOKEN']}"}
+    data = graphql_request(params, url, headers, query, variables)
+    if 'errors' in data:
+        raise Exception(f"Query failed: {data['errors']}")
+    return data['data']
+
+
+def iter_gitlab_issues_graphql(params: dict, since: str = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitLab instance, using the GraphQL API.
+
+    Issues, descriptions and labels are retrieved in large pages. Label
+    events are not available in GraphQL, so the history is still fetched
+    from the REST API, concurrently. Pages are yielded as in
+    iter_gitlab_issues().
+    """
+    print(f"\n# Connection to GitLab at {params['GGI_GITLAB_URL']} - {params['GGI_GITLAB_PROJECT']} (GraphQL).")
+    gl = gitlab.Gitlab(url=params['GGI_GITLAB_URL'], per_page=50, private_token=params['GGI_GITLAB_TOKEN'],
+                       session=get_session())
+    # Lazy project: only used to build the label events URLs.
+    project = gl.projects.get(params['GGI_GITLAB_PROJECT'], lazy=True)
+    page_size = params.get('graphql_page_size', default_graphql_page_size)
 
-        for n in i.resourcelabelevents.list():
-            event = i.resourcelabelevents.get(n.id)
-            label = n.label['name'] if n.label else ''
-            user = n.user['username'] if n.user else 'unknown'
-            hist.append([n.created_at, i.iid, n.id, 'label', user,
-                         f"{n.action} {label}", i.web_url])
+    variables = {'fullPath': params['GGI_GITLAB_PROJECT'], 'first': page_size, 'after': None,
+                 'state': 'opened' if since is None else None, 'updatedAfter': since}
+    if since is None:
+        print("# Fetching issues..")
+    else:
+        print(f"# Fetching issues updated since {since}..")
 
-    return issues, tasks, hist
+    workers = params.get('fetch_workers', default_fetch_workers)
+    print(f"# Fetching label history ({workers} workers)..")
+
+    def query_pages():
+        while True:
+            page = graphql_query(params, graphql_issues_query, variables)['project']['issues']
+            yield page
+            if not page['pageInfo']['hasNextPage']:
+                break
+            variables['after'] = page['pageInfo']['endCursor']
+
+    # Pages are queried ahead, while the history of the previous ones is fetched.
+    # The workers are kept for the whole run.
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+        for page in prefetch(query_pages(), params.get('pipeline_depth', default_pipeline_depth)):
+            closed = [int(n['iid']) for n in page['nodes'] if n['state'] != 'opened']
+            nodes = [n for n in page['nodes'] if n['state'] == 'opened']
+            records = []
+            for n in nodes:
+                # The REST API lists labels sorted by title.
+                labels = sorted([label['title'] for label in n['labels']['nodes']])
+                records.append(build_issue_record(int(n['iid']), n['state'], n['title'], ','.join(labels),
+                                                  issue_timestamp(n['updatedAt']), n['webUrl'], n['description'],
+                                                  parse_cache))
+            history = map_ordered(lambda n: retrieve_label_events(project, int(n['iid']), n['webUrl']),
+                                  nodes, workers, executor)
+            for record, lines in zip(records, history):
+                record['hist'] = lines
+            yield records, closed
+
+
+def retrieve_gitlab_issues_graphql(params: dict, state: dict = None, parse_cache: dict = None):
+    """
+    Retrieve issues from GitLab instance, using the GraphQL API (see
+    iter_gitlab_issues_graphql). State and parse cache are used as in
+    retrieve_gitlab_issues().
+    """
+    since = state.get('updated_at') if state else None
+    records, closed = collect_pages(iter_gitlab_issues_graphql(params, since, parse_cache))
+
+    if state is not None:
+        updated = len(records)
+        updated_at = max([r['issue'][5] for r in records], default=None)
+        records = merge_state(state, params['GGI_GITLAB_PROJECT'], records, closed, updated_at)
+        print(f"  Merged {updated} updated issues, {len(records)} issues in snapshot.")
+
+    return flatten_records(records)
 
 
 def main():
     args = parse_args()
+    if args.opt_stream and args.opt_incremental:
+        print("Options --stream and --incremental cannot be combined.")
+        exit(1)
     params = retrieve_params()
+    setup_http(params)
 
-    issues, tasks, hist = retrieve_gitlab_issues(params)
+    if params.get('gitlab_backend', 'rest') == 'graphql':
+        retrieve_issues, iter_issues = retrieve_gitlab_issues_graphql, iter_gitlab_issues_graphql
+    else:
+        retrieve_issues, iter_issues = retrieve_gitlab_issues, iter_gitlab_issues
 
-    issues_df = pd.DataFrame(issues, columns=['issue_id', 'activity_id', 'state', 'title', 'labels',
-                                              'updated_at', 'url', 'desc', 'workflow', 'tasks_total', 'tasks_done'])
-    tasks_df = pd.DataFrame(tasks, columns=['issue_id', 'state', 'task'])
-    hist_df = pd.DataFrame(hist, columns=['time', 'issue_id', 'event_id', 'type', 'author', 'action', 'url'])
-
-    write_to_csv(issues_df, tasks_df, hist_df)
-    write_activities_to_md(issues_df)
-    write_data_points(issues_df, params)
+    file_cache = params.get('parse_cache_file', default_parse_cache_file)
+    parse_cache = load_parse_cache(file_cache, params['GGI_GITLAB_PROJECT'])
+    web_dir = params.get('output_dir', default_output_dir)
+    manifest = load_manifest(web_dir)
+    if args.opt_stream:
+        pages = store_event_pages(params, params['GGI_GITLAB_PROJECT'],
+                                  iter_issues(params, parse_cache=parse_cache))
+        issue_ids = generate_website_stream(pages, params, web_dir, manifest)
+    else:
+        if args.opt_incremental:
+            file_state = params.get('state_file', default_state_file)
+            state = load_state(file_state, params['GGI_GITLAB_PROJECT'])
+            issues, tasks, hist = retrieve_issues(params, state, parse_cache)
+            save_state(file_state, state)
+        else:
+            issues, tasks, hist = retrieve_issues(params, parse_cache=parse_cache)
+        hist = store_events(params, params['GGI_GITLAB_PROJECT'], issues, hist)
+        issue_ids = [i[0] for i in issues]
+        generate_website(issues, tasks, hist, params, web_dir, manifest)
+    save_parse_cache(file_cache, parse_cache, issue_ids)
 
     print("\n# Replacing keywords in static website.")
-    keywords = {
-        '[GGI_URL]': params['GGI_URL'],
-        '[GGI_PAGES_URL]': params['GGI_PAGES_URL'],
-        '[GGI_ACTIVITIES_URL]': params['GGI_ACTIVITIES_URL'],
-        '[GGI_CURRENT_DATE]': str(date.today())
-    }
+    keywords = get_keywords(params, params['GGI_URL'])
 
-    update_keywords('web/config.toml', keywords)
-    update_keywords('web/content/includes/initialisation.inc', keywords)
-    update_keywords('web/content/scorecards/_index.md', keywords)
-    files = glob.glob("web/content/*.md")
-    for file in files:
-        if os.path.isfile(file):
-            update_keywords(file, keywords)
+    render_templates(web_dir, keywords, manifest)
 
+    print_http_stats()
     print("Done.")
 
 
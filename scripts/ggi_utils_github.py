@@ -17,14 +17,16 @@ import urllib.parse
 from github import Github, Auth
 
 from ggi_deploy import *
+from ggi_http import graphql_request
 
 public_github_root_url="https://github.com/"
 
-def retrieve_params():
+def retrieve_params(board: dict = None):
     """
     Read metadata for activities and deployment options.
 
     Determine GitHub server URL and Project name
+    * From the board definition in fleet mode, or
     * From Environment variable if available, or
     * From configuration file otherwise
     """
@@ -32,10 +34,16 @@ def retrieve_params():
     print(f"# Reading deployment options from {conf_file}.")
     with open(conf_file, 'r', encoding='utf-8') as f:
         params = json.load(f)
+    board = board or {}
+    params.update(board)
 
     # Get GGI_GITHUB_PROJECT
+    # P0: Search fleet configuration
+    if board.get('github_project'):
+        params['GGI_GITHUB_PROJECT'] = board['github_project']
+        print("- Using Project from fleet configuration")
     # P1: Search environment variable
-    if 'github_project' in os.environ:
+    elif 'github_project' in os.environ:
         params['GGI_GITHUB_PROJECT'] = os.environ['github_project']
         print("- Using Project from env var 'GGI_GITHUB_PROJECT'")
     # P2: Search Json configuration file
@@ -51,7 +59,10 @@ def retrieve_params():
               "my-ggi-board. Exiting.")
         exit(1)
 
-    if 'GGI_GITHUB_TOKEN' in os.environ:
+    if 'token_env' in board and board['token_env'] in os.environ:
+        print(f"- Using token from env var '{board['token_env']}'.")
+        params['GGI_GITHUB_TOKEN'] = os.environ[board['token_env']]
+    elif 'GGI_GITHUB_TOKEN' in os.environ:
         print("- Using ggi_github_token from env var.")
         params['GGI_GITHUB_TOKEN'] = os.environ['GGI_GITHUB_TOKEN']
     else:
@@ -74,6 +85,11 @@ def retrieve_params():
             re.sub('^.*/', '', params['GGI_GITHUB_PROJECT']))
         print("- Using public GitHub instance.")
 
+    # Pages URL
+    if board.get('pages_url'):
+        params['GGI_PAGES_URL'] = board['pages_url']
+        print("- Using Pages URL from fleet configuration")
+
     params['GGI_ACTIVITIES_URL']= urllib.parse.urljoin(params['GGI_GITHUB_URL'] + '/', 'issues')
     params['GITHUB_ACTIVITIES_URL'] = params['GGI_GITHUB_URL'] + '/projects'
 
@@ -84,6 +100,71 @@ def retrieve_params():
 
     return params
 
+def github_graphql_url(params: dict):
+    """
+    Compute the GraphQL endpoint of the GitHub instance.
+    """
+    if params['GGI_API_URL'] is None:
+        return 'https://api.github.com/graphql'
+    # GitHub Enterprise: https://host/api/v3 -> https://host/api/graphql
+    return re.sub(r'/v3/?$', '/graphql', params['GGI_API_URL'])
+
+
+def github_api_url(params: dict):
+    """
+    Compute the root URL of the GitHub REST API.
+    """
+    if params['GGI_API_URL'] is None:
+        return 'https://api.github.com'
+    return params['GGI_API_URL'].rstrip('/')
+
+
+def github_graphql_request(params: dict, query: str, variables: dict = None):
+    """
+    Send a GraphQL request to the GitHub instance, and return the decoded
+    response, with its data and errors (see graphql_request).
+    """
+    headers = {'Authorization': f"bearer {params['GGI_GITHUB_TOKEN']}"}
+    return graphql_request(params, github_graphql_url(params), headers, query, variables)
+
+
+def github_graphql(params: dict, query: str, variables: dict = None):
+    """
+    Execute a GraphQL query on the GitHub instance and return its data.
+    """
+    data = github_graphql_request(params, query, variables)
+    if 'errors' in data:
+        raise Exception(f"Query failed: {data['errors']}")
+    return data['data']
+
+
+def github_graphql_batch(params: dict, parts: dict, mutation: bool = False):
+    """
+    Execute independent queries (or mutations) in a single request.
+
+    Parts map an alias to a field selection and its variables, given as
+    {name: (type, value)}, e.g. 'repository(owner: $owner, name: $name) { id }'
+    and {'owner': ('String!', 'ospo'), 'name': ('String!', 'ggi')}. Variables
+    are renamed per alias. Returns the data and the error messages by alias.
+    """
+    declarations, fields, variables = [], [], {}
+    for alias, (selection, part_variables) in parts.items():
+        for name, (type_, value) in part_variables.items():
+            declarations.append(f"${alias}_{name}: {type_}")
+            variables[f"{alias}_{name}"] = value
+            selection = re.sub(rf"\${name}\b", f"${alias}_{name}", selection)
+        fields.append(f"{alias}: {selection}")
+    operation = 'mutation' if mutation else 'query'
+    signature = f" ({', '.join(declarations)})" if declarations else ''
+    query = f"{operation}{signature} {{\n  " + "\n  ".join(fields) + "\n}"
+    response = github_graphql_request(params, query, variables)
+    errors = {}
+    for error in response.get('errors', []):
+        alias = (error.get('path') or ['?'])[0]
+        errors[alias] = error['message']
+    return response.get('data') or {}, errors
+
+
 def get_authent(params: dict):
     headers = {
         "Authorization": f"Bearer {params['GGI_GITHUB_TOKEN']}",
@@ -93,15 +174,17 @@ def get_authent(params: dict):
     # Connecting to the GitHub instance.
     # Manage authentication
     auth = Auth.Token(params['GGI_GITHUB_TOKEN'])
+    # Requests are paced by the shared scheduler, not by PyGithub.
+    pacing = {'seconds_between_requests': 0, 'seconds_between_writes': 0}
     if params['GGI_GITHUB_URL'].startswith(public_github_root_url):
         # Public Web GitHub
         print("- Using public GitHub instance.")
-        github_handle = Github(auth=auth)
+        github_handle = Github(auth=auth, **pacing)
     else:
         print(f"- Using GitHub on-premise host {params['GGI_GITHUB_URL']} ")
         # GitHub Enterprise with custom hostname
         params['GGI_GITHUB_URL'] = f"{params['GGI_GITHUB_URL']}/api/v3"
-        github_handle = Github(auth=auth, base_url=params['GGI_GITHUB_URL'])
+        github_handle = Github(auth=auth, base_url=params['GGI_GITHUB_URL'], **pacing)
 
     print(f"\n# Retrieving project from GitHub at {params['GGI_GITHUB_URL']}.")
     repo = github_handle.get_repo(params['GGI_GITHUB_PROJECT'])
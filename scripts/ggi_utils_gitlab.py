@@ -16,15 +16,15 @@ GitLab utilities for GGI tools.
 import json
 import os
 import urllib.parse
-import tldextract
 
 from ggi_deploy import *
 
-def retrieve_params():
+def retrieve_params(board: dict = None):
     """
     Read metadata for activities and deployment options.
 
     Determine GitLab server URL and Project name:
+    * From the board definition in fleet mode, or
     * From environment variables if available, or
     * From configuration file otherwise.
     """
@@ -32,9 +32,14 @@ def retrieve_params():
     print(f"# Reading deployment options from {conf_file}.")
     with open(conf_file, 'r', encoding='utf-8') as f:
         params = json.load(f)
+    board = board or {}
+    params.update(board)
 
     # GitLab URL
-    if 'CI_SERVER_URL' in os.environ:
+    if board.get('gitlab_url'):
+        params['GGI_GITLAB_URL'] = board['gitlab_url']
+        print("- Using GitLab URL from fleet configuration")
+    elif 'CI_SERVER_URL' in os.environ:
         params['GGI_GITLAB_URL'] = os.environ['CI_SERVER_URL']
         print("- Using GitLab URL from env var 'CI_SERVER_URL'")
     elif 'GGI_GITLAB_URL' in os.environ:
@@ -49,7 +54,10 @@ def retrieve_params():
         exit(1)
 
     # GitLab Project
-    if 'CI_PROJECT_PATH' in os.environ:
+    if board.get('gitlab_project'):
+        params['GGI_GITLAB_PROJECT'] = board['gitlab_project']
+        print("- Using Project from fleet configuration")
+    elif 'CI_PROJECT_PATH' in os.environ:
         params['GGI_GITLAB_PROJECT'] = os.environ['CI_PROJECT_PATH']
         print("- Using Project from env var 'CI_PROJECT_PATH'")
     elif 'GGI_GITLAB_PROJECT' in os.environ:
@@ -63,7 +71,10 @@ def retrieve_params():
         exit(1)
 
     # GitLab Token
-    if 'GGI_GITLAB_TOKEN' in os.environ:
+    if 'token_env' in board and board['token_env'] in os.environ:
+        params['GGI_GITLAB_TOKEN'] = os.environ[board['token_env']]
+        print(f"- Using token from env var '{board['token_env']}'")
+    elif 'GGI_GITLAB_TOKEN' in os.environ:
         params['GGI_GITLAB_TOKEN'] = os.environ['GGI_GITLAB_TOKEN']
         print("- Using token from env var 'GGI_GITLAB_TOKEN'")
     else:
@@ -71,11 +82,16 @@ def retrieve_params():
         exit(1)
 
     # Pages URL
-    if 'CI_PAGES_URL' in os.environ:
+    if board.get('pages_url'):
+        params['GGI_PAGES_URL'] = board['pages_url']
+        print("- Using Pages URL from fleet configuration")
+    elif 'CI_PAGES_URL' in os.environ and not board:
         params['GGI_PAGES_URL'] = os.environ['CI_PAGES_URL']
         print("- Using Pages URL from env var 'CI_PAGES_URL'")
     else:
         print("- Pages URL not found in env. Computing fallback.")
+        # Only needed here, and slow to import.
+        import tldextract
         pieces = tldextract.extract(params['GGI_GITLAB_URL'])
         params['GGI_PAGES_URL'] = 'https://' + params['GGI_GITLAB_PROJECT'].split('/')[0] +                                   '.' + pieces.domain + '.io/' + params['GGI_GITLAB_PROJECT'].split('/')[-1]
 